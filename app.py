@@ -1,53 +1,115 @@
 #Python 3.10
 # -*- coding: utf-8 -*-
-from flask import Flask, request, render_template, send_from_directory, jsonify, request, redirect, url_for, session, flash
+from flask import Flask, request, render_template, send_from_directory, jsonify, redirect, url_for, session, flash, Response, stream_with_context, send_file, g
 import os
-import pandas as pd
+import io
 import json
-from datetime import datetime
-
-from utils import extract_text_from_pdf, analyze_cv, analyze_compared_cv, load_candidates_ranking, generate_pdf, generate_global_report, get_user_folders
-from utils import MAX_CVS, MAX_CVS_COMPARE, USERS_FILE, USERS_FOLDER
-from werkzeug.security import generate_password_hash, check_password_hash
-from marshmallow import Schema, fields, ValidationError
+import queue
+import threading
+import time
+import shutil
+import uuid
+import hashlib
+from datetime import datetime, timezone
+
+from utils import get_user_folders, load_candidates_ranking, sanitize_filename, candidate_pdf_filename, combined_pdf_filename, global_report_filename
+from utils import MAX_CVS, MAX_CVS_COMPARE, MAX_CVS_MAP_REDUCE, USERS_FILE, USERS_FOLDER, DEFAULT_JOB_POSITION
+from werkzeug.security import check_password_hash
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.http import is_resource_modified
+from jobs import JobQueue, JOBS_FOLDER, JOBS_DB
+from pipeline import run_analysis, run_analysis_job, run_append
+from ranking_store import get_ranking_store, SORT_COLUMNS, RANKING_MAX_PAGE_SIZE
+from artifacts import parse_artifact_filename, artifact_etag, render_artifact
+from user_store import get_user_store
+from uploads import ingest_uploads, UPLOAD_CHUNK_SIZE
+from metrics import timed, start_spans, finish_spans, render_metrics, HTTP_REQUEST_SECONDS
+from reranking import rerank_run
+from bulk_import import run_bulk_import_job, import_id_for, resolve_import_directory, IMPORTS_FOLDER
+from settings import get_settings, configure, on_configure
+from storage import new_run_id, run_title, read_archived, disk_usage, start_maintenance
 
 app = Flask(__name__)
-app.secret_key = os.environ.get("SECRET_KEY","")
+
+def create_app(settings=None):
+    """Configura y devuelve la app: ``gunicorn "app:create_app()"``.
+
+    ``settings`` (un ``Settings``) reemplaza la configuración tomada del entorno; la
+    API key de OpenAI no se lee hasta la primera llamada al modelo.
+    """
+    settings = configure(settings) if settings is not None else get_settings()
+    app.secret_key = settings.secret_key
+    app.config["MAX_CONTENT_LENGTH"] = settings.max_upload_request_bytes  # Se rechaza antes de leer el cuerpo del request
+    app.config["METRICS_TOKEN"] = settings.metrics_token
+    return app
 
 ####################################################
 
-def save_users(users):
-    """Guarda los usuarios en el archivo JSON con contraseñas hasheadas."""
-    for user, data in users.items():
-        if "password" in data and not data["password"].startswith("pbkdf2:sha256"):
-            #data["password"] = generate_password_hash(data["password"])
-            data["password"] = data["password"]
-    
-    with open(os.path.join(USERS_FOLDER, USERS_FILE), "w") as file:
-        json.dump(users, file, indent=4)
+_job_queue = None
+
+def get_job_queue():
+    """Devuelve la cola de análisis en segundo plano, creándola en el primer uso."""
+    global _job_queue
+    if _job_queue is None:
+        _job_queue = JobQueue(os.path.join(JOBS_FOLDER, JOBS_DB), run_job)
+        start_maintenance()  # Archivo de ejecuciones antiguas y limpieza de uploads en segundo plano
+    return _job_queue
+
+@on_configure
+def reset_job_queue():
+    """Detiene la cola creada con la configuración anterior; la siguiente ``get_job_queue`` crea otra."""
+    global _job_queue
+    if _job_queue is not None:
+        _job_queue.stop()
+    _job_queue = None
+
+def run_job(payload):
+    """Ejecuta un trabajo de la cola: un análisis normal o una importación masiva."""
+    kind = "bulk_import" if "bulk_source" in payload else payload["analysis_type"]
+    start_spans()
+    try:
+        with timed(f"job_{kind}"):
+            if "bulk_source" in payload:
+                return run_bulk_import_job(payload)
+            return run_analysis_job(payload)
+    finally:
+        finish_spans(job=kind, user=payload["user"])
 
 def verify_password(stored_password, provided_password):
     """Verifica la contraseña del usuario."""
     return check_password_hash(stored_password, provided_password)
 
 def load_users():
-    """Carga los usuarios desde el archivo JSON y maneja errores."""
-    users_path = os.path.join(USERS_FOLDER, USERS_FILE)
-    
-    if not os.path.exists(users_path):
-        os.makedirs(USERS_FOLDER, exist_ok=True)
-        #save_users({"admin": {"username": "admin", "nombre": "admin", "apellido": "admin", "password": generate_password_hash("admin")}})
-        save_users({"admin": {"username": "admin", "nombre": "admin", "apellido": "admin", "password": "admin"}})
-    
-    with open(users_path, "r") as file:
-        return json.load(file)
+    """Devuelve una copia de los usuarios registrados (se leen del disco solo si el archivo cambió)."""
+    return get_user_store(os.path.join(USERS_FOLDER, USERS_FILE)).all()
     
 def get_user_data(session):
     
     user=session["user"]
-    user_data = load_users().get(user, {})
+    user_data = get_user_store(os.path.join(USERS_FOLDER, USERS_FILE)).get(user)
 
     return user_data
+@app.before_request
+def start_request_timing():
+    g.request_start = time.perf_counter()
+    start_spans()
+
+@app.after_request
+def record_request_timing(response):
+    elapsed = time.perf_counter() - g.request_start
+    HTTP_REQUEST_SECONDS.observe(elapsed, endpoint=request.endpoint or "unknown", method=request.method, status=response.status_code)
+    finish_spans(endpoint=request.endpoint, method=request.method, status=response.status_code,
+                 user=session.get("user"), total=round(elapsed, 4))
+    return response
+
+@app.route("/metrics")
+def metrics():
+    """Métricas del proceso en formato Prometheus (tiempos por etapa, llamadas y tokens de OpenAI, requests)."""
+    token = app.config["METRICS_TOKEN"]
+    if token and request.headers.get("Authorization") != f"Bearer {token}":
+        return Response("Unauthorized\n", status=401, mimetype="text/plain")
+    return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
+
 ####################################################
 
 @app.route("/")
@@ -85,6 +147,47 @@ def manage_users():
         flash("Acceso denegado.", "danger")
         return redirect(url_for("login_page"))
 
+    if request.method == "POST":
+        action = request.form.get("action")
+        username = request.form.get("username")
+
+        # Todos los cambios del request se aplican sobre el contenido actual y se escriben una sola vez
+        with get_user_store(os.path.join(USERS_FOLDER, USERS_FILE)).batch() as users:
+            if action == "add":
+                nombre = request.form.get("nombre")
+                apellido = request.form.get("apellido")
+                password = request.form.get("password")
+
+                if username in users:
+                    flash("El usuario ya existe.", "warning")
+                else:
+                    users[username] = {
+                        "username": username,  # Se agrega el campo username
+                        "nombre": nombre,
+                        "apellido": apellido,
+                        "password": password
+                    }
+                    flash(f"Usuario {username} agregado.", "success")
+
+            elif action == "edit":
+                if username in users:
+                    users[username].update({
+                        "username": username,  # Asegurar que el username no se pierda
+                        "nombre": request.form.get("nombre"),
+                        "apellido": request.form.get("apellido"),
+                        "password": request.form.get("password")
+                    })
+                    flash(f"Usuario {username} actualizado.", "success")
+                else:
+                    flash("El usuario no existe.", "warning")
+
+            elif action == "delete" and username:
+                if username in users and username != "admin":
+                    del users[username]
+                    flash(f"Usuario {username} eliminado.", "success")
+                else:
+                    flash("No puedes eliminar este usuario.", "warning")
+
     users = load_users()
 
     # Asegurar que todos los usuarios tengan el campo "username"
@@ -92,51 +195,77 @@ def manage_users():
         if "username" not in user_data:
             user_data["username"] = user_key
 
-    if request.method == "POST":
-        action = request.form.get("action")
-        username = request.form.get("username")
+    usage = {username: disk_usage(username)["total"] for username in users}
+    return render_template("admin.html", users=users, disk_usage=usage, user_data=get_user_data(session))
 
-        if action == "add":
-            nombre = request.form.get("nombre")
-            apellido = request.form.get("apellido")
-            password = request.form.get("password")
+####################################################
+def prepare_analysis_request(user_folders):
+    """Valida el formulario de análisis y guarda los CVs subidos.
 
-            if username in users:
-                flash("El usuario ya existe.", "warning")
-            else:
-                users[username] = {
-                    "username": username,  # Se agrega el campo username
-                    "nombre": nombre,
-                    "apellido": apellido,
-                    "password": password
-                }
-                save_users(users)
-                flash(f"Usuario {username} agregado.", "success")
-
-        elif action == "edit":
-            if username in users:
-                users[username].update({
-                    "username": username,  # Asegurar que el username no se pierda
-                    "nombre": request.form.get("nombre"),
-                    "apellido": request.form.get("apellido"),
-                    "password": request.form.get("password")
-                })
-                save_users(users)
-                flash(f"Usuario {username} actualizado.", "success")
-            else:
-                flash("El usuario no existe.", "warning")
+    Devuelve una tupla (payload, error); el payload contiene todo lo necesario para
+    ejecutar ``pipeline.run_analysis`` fuera del request.
+    """
+    try:
+        analysis_type = request.form.get("analysis_type")
+        files = request.files.getlist("pdf_files")
+    except RequestEntityTooLarge:
+        return None, f"Los archivos subidos superan el límite de {get_settings().max_upload_request_bytes // (1024 * 1024)} MB por análisis."
+    fecha = new_run_id()
 
-        elif action == "delete" and username:
-            if username in users and username != "admin":
-                del users[username]
-                save_users(users)
-                flash(f"Usuario {username} eliminado.", "success")
-            else:
-                flash("No puedes eliminar este usuario.", "warning")
+    append_to = request.form.get("append_to", "")  # Agregar los CVs a una ejecución existente en lugar de crear otra
 
-    return render_template("admin.html", users=users, user_data=get_user_data(session))
+    if str(files) == "[<FileStorage: '' ('application/octet-stream')>]": # Si no se han subido archivos
+        return None, "No se han subido archivos."
+    elif append_to:
+        if not get_ranking_store(user_folders).has_run(append_to):
+            return None, "No se encontró la ejecución a la que agregar los CVs."
+        if len(files) > MAX_CVS_MAP_REDUCE:
+            return None, f"No se pueden analizar más de {MAX_CVS_MAP_REDUCE} CVs a la vez."
+    elif analysis_type == "comparison" and len(files) > MAX_CVS_COMPARE:
+        return None, f"No se pueden analizar más de {MAX_CVS_COMPARE} CVs a la vez."
+    elif analysis_type in ("map_reduce", "prefilter"):
+        if len(files) > MAX_CVS_MAP_REDUCE:
+            return None, f"No se pueden analizar más de {MAX_CVS_MAP_REDUCE} CVs a la vez."
+    elif len(files) > MAX_CVS:
+        return None, f"No se pueden analizar más de {MAX_CVS} CVs a la vez."
+
+    if analysis_type == "prefilter" and not append_to and not (request.form.get("job_position") or request.form.get("skills")):
+        return None, "Indique el puesto objetivo o las habilidades clave para preseleccionar los CVs."
+
+    if analysis_type not in ("comparison", "map_reduce", "prefilter") and not append_to:
+        # En modo individual, analizamos el CV por separado
+        return None, "Funcion no implementada."
+
+    # Los CVs se copian por bloques al almacén por contenido; los duplicados no se vuelven a escribir
+    ingested, error = ingest_uploads(files, user_folders.upload)
+    if error:
+        return None, error
+    files_names = [name for name, path, digest in ingested]
+    files_paths = [path for name, path, digest in ingested]
+
+    if append_to:
+        return {
+            "user": session["user"],
+            "analysis_type": "append",
+            "append_to": append_to,
+            "files_names": files_names,
+            "files_paths": files_paths,
+            "files_hashes": [digest for name, path, digest in ingested],
+            "fecha": append_to,
+        }, None
+
+    return {
+        "user": session["user"],
+        "analysis_type": analysis_type,
+        "files_names": files_names,
+        "files_paths": files_paths,
+        "files_hashes": [digest for name, path, digest in ingested],
+        "job_position": request.form.get("job_position") or DEFAULT_JOB_POSITION,
+        "skills": request.form.get("skills", ""),
+        "fecha": fecha,
+        "combined_pdf": request.form.get("combined_pdf") == "on",
+    }, None
 
-####################################################
 @app.route("/analyze", methods=["POST"])
 def analyze():
 
@@ -147,93 +276,140 @@ def analyze():
     if not user_folders:
         return redirect(url_for("login_page"))
     
-    analysis_type = request.form.get("analysis_type")
-    files = request.files.getlist("pdf_files")
-    job_position = "No especificado"
-    rankings = []
-    all_cv_texts = []  # Lista para almacenar los textos de todos los CVs si estamos en modo comparación
-    fecha = datetime.now().strftime("%Y%m%d%H%M")
-    fecha_title = pd.to_datetime(fecha).strftime("%d/%m/%Y %H:%M")
+    payload, error = prepare_analysis_request(user_folders)
+    if error:
+        return render_template("error.html", error_message=error, user_data=get_user_data(session)), 400
 
-    if str(files) == "[<FileStorage: '' ('application/octet-stream')>]": # Si no se han subido archivos
-        return render_template("error.html", error_message="No se han subido archivos.",user_data=get_user_data(session)), 400
-    elif analysis_type == "comparison" and len(files) > MAX_CVS_COMPARE:
-        error_message = "No se pueden analizar más de {MAX_CVS_COMPARE} CVs a la vez."
-        return render_template("error.html", error_message=error_message,user_data=get_user_data(session)), 400
-    elif len(files) > MAX_CVS:
-        error_message = "No se pueden analizar más de {MAX_CVS} CVs a la vez."
-        return render_template("error.html", error_message=error_message,user_data=get_user_data(session)), 400
-
-    files_names  = []
-    for file in files:
-        filename = os.path.join(user_folders.upload, file.filename)
-        files_names.append(file.filename)
-        
-        file.save(filename)
-        text = extract_text_from_pdf(filename)
-
-        # En modo de comparación, guardamos todos los textos de los CVs
-        if analysis_type == "comparison":
-            if text:
-                all_cv_texts.append("CV: {filename}\n{text}".format(filename=file.filename, text=text))
-        else:
-            # En modo individual, analizamos el CV por separado
-            return render_template("error.html", error_message="Funcion no implementada.",user_data=get_user_data(session)), 400
-            # if text:
-            #     analysis, error = analyze_cv(text)
-            #     if error:
-            #         return render_template("error.html", error_message=error,user_data=get_user_data(session)), 400
-            #     rankings.append({"Nombre": file.filename, "Puntaje": analysis.get("evaluacion", {}).get("puntaje", "N/A")})
-            # else:
-            #     analysis, error = None, "No se pudo extraer texto del CV."
-            #     rankings.append({"Nombre": file.filename, "Puntaje": "N/A"})
-
-    # Si estamos en modo de comparación, analizamos todos los CVs juntos
-    if analysis_type == "comparison":
-        # Unir todos los textos de los CVs en un solo string
-        combined_text = "\n".join(all_cv_texts)
-
-        data = request.form.get("job_position")
-        if data:
-            job_position = data
-        else:
-            job_position = "No especificado"
+    # El análisis completo corre en segundo plano; el navegador consulta /api/jobs/<id>
+    job_id = get_job_queue().submit(session["user"], payload)
 
-        # Enviar el texto combinado a OpenAI para análisis de comparación
-        analysis, error = analyze_compared_cv(combined_text,job_position)
+    if request.accept_mimetypes.best == "application/json":
+        return jsonify({"job_id": job_id, "status_url": url_for("api_job_status", job_id=job_id)}), 202
 
-        if error:
-            return render_template("error.html", error_message=error, user_data=get_user_data(session)), 400
+    return render_template("job_status.html", job_id=job_id, user_data=get_user_data(session)), 202
 
-        pdf_paths = generate_pdf(analysis, user_folders, fecha)  # Guardamos el JSON en el PDF
-        # Verificar si analysis contiene candidatos
-        rankings = load_candidates_ranking(analysis, rankings, pdf_paths)
+@app.route("/import", methods=["POST"])
+def bulk_import():
+    """Importación masiva: analiza todos los CVs de un ZIP subido o de una carpeta del servidor en un único ranking."""
+    if "user" not in session:  # Si el usuario no está en sesión, redirige al login
+        return redirect(url_for("login_page"))
 
-        # Ordenar por puntaje (si es necesario)
-        rankings.sort(key=lambda x: x['puntaje'], reverse=True)
-    
-    # Si estamos en modo individual, ya hemos asignado los puntajes durante el loop anterior
-    if analysis_type == "comparison" and rankings:
-        # Guardar el ranking en un archivo CSV
-        rankings_df = pd.DataFrame(rankings).sort_values(by="puntaje", ascending=False)
-        rankings_df.to_csv(os.path.join(user_folders.rankings, f"cv_ranking_{fecha}.csv"), index=False)
-    
-    report_filename = generate_global_report(files_names, job_position, analysis, user_folders, fecha)  # Generar el reporte global
+    user_folders = get_user_folders(session)
+    if not user_folders:
+        return redirect(url_for("login_page"))
 
-    filters = {
-        "min_score": 0,
-        "max_score": 100,
-        "industry": "",
-        "skills": ""
+    try:
+        zip_file = request.files.get("zip_file")
+        directory = request.form.get("directory", "").strip()
+    except RequestEntityTooLarge:
+        error = f"Los archivos subidos superan el límite de {get_settings().max_upload_request_bytes // (1024 * 1024)} MB por análisis."
+        return render_template("error.html", error_message=error, user_data=get_user_data(session)), 400
+
+    if zip_file and zip_file.filename:
+        # El ZIP se guarda por bloques; sus PDFs se descomprimen de a uno durante la importación
+        imports_folder = os.path.join(user_folders.upload, IMPORTS_FOLDER)
+        os.makedirs(imports_folder, exist_ok=True)
+        source = os.path.join(imports_folder, f"{uuid.uuid4().hex}.zip")
+        with open(source, "wb") as file:
+            shutil.copyfileobj(zip_file.stream, file, UPLOAD_CHUNK_SIZE)
+    elif directory:
+        source = resolve_import_directory(directory)
+        if source is None:
+            return render_template("error.html", error_message="Carpeta de importación no válida.", user_data=get_user_data(session)), 400
+    else:
+        return render_template("error.html", error_message="Suba un archivo ZIP o indique una carpeta.", user_data=get_user_data(session)), 400
+
+    job_position = request.form.get("job_position") or DEFAULT_JOB_POSITION
+    payload = {
+        "user": session["user"],
+        "bulk_source": source,
+        "job_position": job_position,
+        "combined_pdf": request.form.get("combined_pdf") == "on",
+        "import_id": import_id_for(session["user"], source, job_position),
     }
-    # Devolvemos la plantilla de ranking sin filtrado
-    return render_template("filtered_ranking.html",
-                           rankings=rankings_df.to_dict(orient="records"),
-                           fecha_title=fecha_title,
-                           fecha=fecha,
-                           filters=filters,
-                           report_filename=report_filename,
-                           user_data=get_user_data(session))
+    job_id = get_job_queue().submit(session["user"], payload)
+
+    if request.accept_mimetypes.best == "application/json":
+        return jsonify({"job_id": job_id, "import_id": payload["import_id"],
+                        "status_url": url_for("api_job_status", job_id=job_id)}), 202
+
+    return render_template("job_status.html", job_id=job_id, user_data=get_user_data(session)), 202
+
+@app.route("/analyze/stream", methods=["POST"])
+def analyze_stream():
+    """Variante de /analyze que envía cada candidato al navegador (Server-Sent Events) en cuanto el modelo lo devuelve."""
+    if "user" not in session:  # Si el usuario no está en sesión, redirige al login
+        return redirect(url_for("login_page"))
+
+    user_folders = get_user_folders(session)
+    if not user_folders:
+        return redirect(url_for("login_page"))
+
+    payload, error = prepare_analysis_request(user_folders)
+    if error:
+        return jsonify({"error": error}), 400
+
+    events = queue.Queue()
+    fecha = payload["fecha"]
+
+    def on_candidate(candidato):
+        cv_name = sanitize_filename(candidato.get("nombre", "Candidato"))
+        pdf_filename = combined_pdf_filename(fecha) if payload.get("combined_pdf") else candidate_pdf_filename(cv_name, fecha)
+        row = load_candidates_ranking({"candidatos": [candidato]}, [], {cv_name: pdf_filename})
+        events.put(("candidato", row[0]))
+
+    def run():
+        try:
+            if payload.get("append_to"):
+                result, error = run_append(payload["user"], fecha, payload["files_names"], payload["files_paths"],
+                                           files_hashes=payload["files_hashes"], on_candidate=on_candidate)
+            else:
+                result, error = run_analysis(payload["user"], payload["analysis_type"], payload["files_names"],
+                                             payload["files_paths"], payload["job_position"], fecha, on_candidate,
+                                             combined_pdf=payload["combined_pdf"], files_hashes=payload["files_hashes"],
+                                             skills=payload["skills"])
+        except Exception as e:
+            result, error = None, f"Error inesperado durante el análisis: {e}"
+        events.put(("error", {"error": error}) if error else ("done", result))
+
+    threading.Thread(target=run, daemon=True).start()
+
+    def generate():
+        while True:
+            event, data = events.get()
+            if event == "done":
+                data = dict(data, ranking_url=url_for("filtered_ranking", fecha=data["fecha"]),
+                            report_url=url_for("download", filename=data["report_filename"]))
+            yield f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+            if event in ("done", "error"):
+                break
+
+    return Response(stream_with_context(generate()), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.route("/api/jobs/<job_id>")
+def api_job_status(job_id):
+    if "user" not in session:  # Si el usuario no está en sesión, redirige al login
+        return redirect(url_for("login_page"))
+
+    job = get_job_queue().get(job_id)
+    if job is None or job["user"] != session["user"]:
+        return jsonify({"error": "Trabajo no encontrado."}), 404
+
+    response = {
+        "job_id": job["id"],
+        "status": job["status"],
+        "position": job["position"],
+        "created": job["created"],
+        "started": job["started"],
+        "finished": job["finished"],
+        "error": job["error"],
+        "result": job["result"],
+    }
+    if job["status"] == "done":
+        response["ranking_url"] = url_for("filtered_ranking", fecha=job["result"]["fecha"])
+        response["report_url"] = url_for("download", filename=job["result"]["report_filename"])
+    return jsonify(response)
     
     
 @app.route("/download/<filename>")
@@ -254,6 +430,24 @@ def download(filename):
         folder = user_folders.upload
 
         folder = os.path.join(os.getcwd(), folder)        
+
+    # Los PDFs de análisis y reportes se generan bajo demanda desde el análisis guardado
+    if parse_artifact_filename(filename) and not os.path.exists(os.path.join(folder, filename)):
+        etag = artifact_etag(user_folders, filename)
+        if etag and request.if_none_match.contains(etag):
+            response = app.response_class(status=304)
+            response.set_etag(etag)
+            return response
+
+        pdf_bytes, etag = render_artifact(user_folders, filename)
+        if pdf_bytes is None:
+            # PDFs generados antes de guardar el análisis: pueden estar en el archivo mensual de la ejecución
+            pdf_bytes = read_archived(user_folders, parse_artifact_filename(filename)[1], f"{os.path.basename(folder)}/{filename}")
+        if pdf_bytes is None:
+            return render_template("error.html", error_message="Archivo no encontrado.", user_data=get_user_data(session)), 404
+        return send_file(io.BytesIO(pdf_bytes), mimetype="application/pdf", as_attachment=True,
+                         download_name=filename, etag=etag or False, conditional=True)
+
     try:
         # Envía el archivo solicitado desde la carpeta de resultados
         return send_from_directory(folder, filename, as_attachment=True)
@@ -269,16 +463,14 @@ def reports_page():
     if not user_folders:
         return redirect(url_for("login_page"))
 
-    # Obtener la lista de archivos en la carpeta de reportes
+    # Los reportes se generan al descargarlos: se listan a partir de las ejecuciones guardadas
     report_files = [
         {
-            "filename": f,
-            "date": f.split("_")[-1].replace(".pdf", "")  # Extrae la fecha del nombre
+            "filename": run["report_filename"] or global_report_filename(run["fecha"]),
+            "date": run["fecha"]
         }
-        for f in os.listdir(user_folders.reports) if f.startswith("global_report_") and f.endswith(".pdf")
+        for run in get_ranking_store(user_folders).list_runs()  # Ordenadas por fecha descendente
     ]
-    # Ordenar por fecha descendente
-    report_files.sort(key=lambda x: x["date"], reverse=True)
 
     return render_template("reports.html", report_files=report_files, user_data=get_user_data(session))
 
@@ -291,18 +483,9 @@ def rankings_page():
     if not user_folders:
         return redirect(url_for("login_page"))
 
-    # Obtener la lista de archivos en la carpeta de reportes
-    ranking_files = [
-        {
-            "filename": f,
-            "date": f.split("_")[-1].replace(".csv", "")  # Extrae la fecha del nombre
-        }
-        for f in os.listdir(user_folders.rankings  ) if f.startswith("cv_ranking") and f.endswith(".csv")
-    ]
-    # Ordenar por fecha descendente
-    ranking_files.sort(key=lambda x: x["date"], reverse=True)
+    ranking_runs = get_ranking_store(user_folders).list_runs()  # Ordenadas por fecha descendente
 
-    return render_template("rankings.html", ranking_files=ranking_files, user_data=get_user_data(session))
+    return render_template("rankings.html", ranking_runs=ranking_runs, user_data=get_user_data(session))
 
 # Agregar filtrado en la interfaz web
 @app.route("/filtered_ranking/<fecha>")
@@ -314,43 +497,81 @@ def filtered_ranking(fecha):
     if not user_folders:
         return redirect(url_for("login_page"))
 
-    rankings_df = pd.read_csv(os.path.join(user_folders.rankings, f"cv_ranking_{fecha}.csv"))
+    store = get_ranking_store(user_folders)
+    run = store.get_run(fecha)
+    if run is None:
+        return render_template("error.html", error_message="Ranking no encontrado.", user_data=get_user_data(session)), 404
 
     min_score = request.args.get("min_score", default=0, type=int)
     max_score = request.args.get("max_score", default=100, type=int)
     industry_filter = request.args.get("industry", default="", type=str)
     skills_filter = request.args.get("skills", default="", type=str)
-    
-    filtered_rankings = rankings_df[(rankings_df["puntaje"] >= min_score) & (rankings_df["puntaje"] <= max_score)]
-    
-    if industry_filter:
-        filtered_rankings = filtered_rankings[filtered_rankings["industria"].str.contains(industry_filter, case=False, na=False)]
-                                              
-    
-    if skills_filter:
-        filtered_rankings = filtered_rankings[filtered_rankings["habilidades"].str.contains(skills_filter, case=False, na=False)]
-    
+    sort, descending, page_number, per_page = ranking_page_args()
+
+    # Solo las columnas de resumen y una página; el detalle de cada candidato se pide a /api/rankings/<fecha>/candidates/<id>
+    page = store.get_rankings_page(fecha, min_score, max_score, industry_filter, skills_filter,
+                                   sort=sort, descending=descending, page=page_number, per_page=per_page)
+
     filters = {
         "min_score": min_score,
         "max_score": max_score,
         "industry": industry_filter,
         "skills": skills_filter
     }
-    report_filename = f"global_report_{fecha}.pdf"
-    fecha_title = pd.to_datetime(fecha).strftime("%d/%m/%Y %H:%M")
+    report_filename = run["report_filename"] or f"global_report_{fecha}.pdf"
+    fecha_title = run_title(fecha)
 
     # Devolvemos la plantilla de ranking con filtrado
     return render_template("filtered_ranking.html",
-                           rankings=filtered_rankings.to_dict(orient="records"),
+                           rankings=page["results"],
+                           total=page["total"],
+                           page=page_number,
+                           pages=max((page["total"] + per_page - 1) // per_page, 1),
+                           per_page=per_page,
+                           sort=sort,
+                           order="desc" if descending else "asc",
+                           aggregates=json.loads(store.get_aggregates_json(fecha)),
                            fecha_title=fecha_title,
                            fecha=fecha,
                            filters=filters,
                            report_filename=report_filename,
                            user_data=get_user_data(session))
 
+def ranking_page_args():
+    """Orden y página pedidos para un ranking: (columna, descendente, página, tamaño de página)."""
+    sort = request.args.get("sort", default="puntaje", type=str)
+    order = request.args.get("order", default="desc" if sort == "puntaje" else "asc", type=str)
+    page = max(request.args.get("page", default=1, type=int), 1)
+    per_page = min(max(request.args.get("per_page", default=get_settings().ranking_page_size, type=int), 1), RANKING_MAX_PAGE_SIZE)
+    return (sort if sort in SORT_COLUMNS else "puntaje"), order != "asc", page, per_page
+
+def run_json_response(fecha, run, build):
+    """Respuesta JSON condicional de una ejecución: 304 si no cambió desde la versión que tiene el cliente.
+
+    El ETag depende de la última modificación de la ejecución, de la ruta y de los
+    parámetros pedidos; ``build`` arma el cuerpo (un JSON ya serializado) solo si hace falta.
+    """
+    last_modified = datetime.fromtimestamp(run["updated"] or run["created"], timezone.utc)
+    etag = hashlib.sha1(f"{request.path}:{run['updated']}:{request.query_string.decode()}".encode("utf-8")).hexdigest()
+    if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        response = app.response_class(status=304)
+    else:
+        response = app.response_class(build(), mimetype="application/json")
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
 ###### API ######
 @app.route("/api/rankings/<fecha>")
 def api_rankings(fecha):
+    """Ranking de una ejecución en JSON, con los filtros min_score, max_score, industry y skills.
+
+    Con ``fields=summary`` solo devuelve las columnas de resumen y el ``id`` de cada
+    candidato. Con ``page`` (y ``per_page``, ``sort``, ``order``) devuelve una página:
+    /api/rankings/202501011200?page=2&per_page=50&sort=nombre&order=asc&fields=summary
+    """
     if "user" not in session:  # Si el usuario no está en sesión, redirige al login
         return redirect(url_for("login_page"))
     
@@ -358,13 +579,118 @@ def api_rankings(fecha):
     if not user_folders:
         return redirect(url_for("login_page"))
 
-    rankings_path = os.path.join(user_folders.rankings, f"cv_ranking_{fecha}.csv")
+    store = get_ranking_store(user_folders)
+    run = store.get_run(fecha)
+    if run is None:
+        return jsonify([]), 404
+
+    filters = {
+        "min_score": request.args.get("min_score", default=None, type=float),
+        "max_score": request.args.get("max_score", default=None, type=float),
+        "industry": request.args.get("industry", default="", type=str),
+        "skills": request.args.get("skills", default="", type=str),
+        "summary": request.args.get("fields", default="", type=str) == "summary",
+    }
+    if "page" not in request.args:
+        # Sin ``page`` se devuelve el ranking completo, como antes
+        return run_json_response(fecha, run, lambda: store.get_rankings_json(fecha, **filters))
+
+    sort, descending, page, per_page = ranking_page_args()
+    return run_json_response(fecha, run, lambda: store.get_rankings_page_json(
+        fecha, sort=sort, descending=descending, page=page, per_page=per_page, **filters))
+
+@app.route("/api/rankings/<fecha>/candidates/<int:candidate_id>")
+def api_ranking_candidate(fecha, candidate_id):
+    """Fila completa de un candidato (perfil, experiencia, MBTI, pros y contras) para la vista de detalle."""
+    if "user" not in session:  # Si el usuario no está en sesión, redirige al login
+        return redirect(url_for("login_page"))
+
+    user_folders = get_user_folders(session)
+    if not user_folders:
+        return redirect(url_for("login_page"))
+
+    store = get_ranking_store(user_folders)
+    run = store.get_run(fecha)
+    candidate = store.get_candidate(fecha, candidate_id) if run else None
+    if candidate is None:
+        return jsonify({"error": "Candidato no encontrado."}), 404
+    return run_json_response(fecha, run, lambda: json.dumps(candidate, ensure_ascii=False))
+
+@app.route("/api/rankings/<fecha>/summary")
+def api_ranking_summary(fecha):
+    """Resumen precalculado de una ejecución: histograma de puntajes, habilidades más frecuentes e industrias."""
+    if "user" not in session:  # Si el usuario no está en sesión, redirige al login
+        return redirect(url_for("login_page"))
+
+    user_folders = get_user_folders(session)
+    if not user_folders:
+        return redirect(url_for("login_page"))
+
+    store = get_ranking_store(user_folders)
+    run = store.get_run(fecha)
+    if run is None:
+        return jsonify({"error": "Ranking no encontrado."}), 404
+    return run_json_response(fecha, run, lambda: store.get_aggregates_json(fecha))
+
+@app.route("/api/rerank/<fecha>")
+def api_rerank(fecha):
+    """Re-rankea una ejecución con otros criterios sobre los perfiles guardados, sin llamar a OpenAI.
+
+    Ejemplo: /api/rerank/202501011200?job_position=Data Engineer&skills=Spark,Airflow&match_weight=0.5&min_score=60
+    """
+    if "user" not in session:  # Si el usuario no está en sesión, redirige al login
+        return redirect(url_for("login_page"))
+
+    user_folders = get_user_folders(session)
+    if not user_folders:
+        return redirect(url_for("login_page"))
+
+    rows, error = rerank_run(
+        user_folders, fecha,
+        job_position=request.args.get("job_position", default="", type=str),
+        skills=request.args.get("skills", default="", type=str),
+        llm_weight=max(request.args.get("llm_weight", default=1.0, type=float), 0.0),
+        match_weight=request.args.get("match_weight", default=None, type=float),
+        min_score=request.args.get("min_score", default=None, type=float),
+        max_score=request.args.get("max_score", default=None, type=float),
+        industry=request.args.get("industry", default="", type=str),
+        required_skills=request.args.get("required_skills", default="", type=str),
+    )
+    if error:
+        return jsonify({"error": error}), 404
+    return app.response_class(json.dumps(rows, ensure_ascii=False), mimetype="application/json")
+
+@app.route("/api/storage")
+def api_storage():
+    """Espacio en disco del usuario por carpeta (uploads, results, reports, ranking, archive) y total, en bytes."""
+    if "user" not in session:  # Si el usuario no está en sesión, redirige al login
+        return redirect(url_for("login_page"))
+    return jsonify(disk_usage(session["user"]))
+
+@app.route("/api/search")
+def api_search():
+    """Busca candidatos en todos los rankings del usuario.
+
+    Ejemplo: /api/search?q=Python AND Kubernetes&min_score=70&days=90&page=1&per_page=20
+    """
+    if "user" not in session:  # Si el usuario no está en sesión, redirige al login
+        return redirect(url_for("login_page"))
+
+    user_folders = get_user_folders(session)
+    if not user_folders:
+        return redirect(url_for("login_page"))
 
-    if os.path.exists(rankings_path):
-        #rankings_df = pd.read_csv(rankings_path)
-        rankings_df = pd.read_csv(rankings_path, encoding="utf-8")
-        return rankings_df.to_json(orient="records", force_ascii=False) 
-    return jsonify([]), 404
+    results = get_ranking_store(user_folders).search(
+        query=request.args.get("q", default="", type=str),
+        min_score=request.args.get("min_score", default=None, type=float),
+        max_score=request.args.get("max_score", default=None, type=float),
+        days=request.args.get("days", default=None, type=int),
+        page=max(request.args.get("page", default=1, type=int), 1),
+        per_page=min(max(request.args.get("per_page", default=20, type=int), 1), 100),
+    )
+    return app.response_class(json.dumps(results, ensure_ascii=False), mimetype="application/json")
+
+create_app()
 
 if __name__ == "__main__":
     app.run(debug=True)
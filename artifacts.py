@@ -0,0 +1,227 @@
+#Python 3.10
+# -*- coding: utf-8 -*-
+import os
+import re
+import gzip
+import json
+import hashlib
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: solo se sincronizan los hilos del proceso
+    fcntl = None
+
+from cache import MemoryLRUCache
+from metrics import timed
+from settings import get_settings, on_configure
+from storage import RUN_ID_PATTERN, RESULTS_FOLDER, is_run_id, run_title, archived_member, read_archived
+from utils import sanitize_filename
+
+ANALYSIS_FORMAT_VERSION = 2  # 1: analysis_<fecha>.json sin versión; 2: JSON comprimido con gzip y versionado
+
+# Nombres de los PDFs que se pueden generar bajo demanda a partir del análisis guardado
+GLOBAL_REPORT_RE = re.compile(rf"^global_report_(?P<fecha>{RUN_ID_PATTERN})\.pdf$")
+COMBINED_RE = re.compile(rf"^combined_analysis_(?P<fecha>{RUN_ID_PATTERN})\.pdf$")
+CANDIDATE_RE = re.compile(rf"^(?P<cv_name>.*)_analysis_(?P<fecha>{RUN_ID_PATTERN})\.pdf$")
+
+_artifact_cache = None
+_run_locks = {}
+_run_locks_lock = threading.Lock()
+
+
+def get_artifact_cache():
+    """Devuelve la cache en memoria de los PDFs generados, creándola en el primer uso."""
+    global _artifact_cache
+    if _artifact_cache is None:
+        _artifact_cache = MemoryLRUCache(get_settings().artifact_cache_max_bytes)
+    return _artifact_cache
+
+
+@on_configure
+def reset_artifact_cache():
+    global _artifact_cache
+    _artifact_cache = None
+
+
+def analysis_path(user_folders, fecha):
+    return os.path.join(user_folders.results, f"analysis_{fecha}.json.gz")
+
+
+def legacy_analysis_path(user_folders, fecha):
+    """Ruta del análisis sin comprimir (versión 1), que se sigue leyendo."""
+    return os.path.join(user_folders.results, f"analysis_{fecha}.json")
+
+
+def stored_analysis_path(user_folders, fecha):
+    """Ruta del análisis guardado de una ejecución, en el formato que tenga, o None si no existe (o está archivado)."""
+    if not is_run_id(fecha):
+        return None
+    for path in (analysis_path(user_folders, fecha), legacy_analysis_path(user_folders, fecha)):
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def save_analysis(user_folders, fecha, analysis, files_names, job_position, files_hashes=None):
+    """Guarda el análisis completo de una ejecución (JSON comprimido) para generar sus PDFs y re-rankear más tarde."""
+    path = analysis_path(user_folders, fecha)
+    stored = {
+        "version": ANALYSIS_FORMAT_VERSION,
+        "fecha": fecha,
+        "job_position": job_position,
+        "files_names": files_names,
+        "analysis": analysis,
+    }
+    if files_hashes:
+        stored["files_hashes"] = files_hashes
+    with gzip.open(path + ".tmp", "wt", encoding="utf-8", compresslevel=6) as file:
+        json.dump(stored, file, ensure_ascii=False, separators=(",", ":"))
+    os.replace(path + ".tmp", path)
+
+    legacy = legacy_analysis_path(user_folders, fecha)
+    if os.path.exists(legacy):
+        os.remove(legacy)
+
+
+def _archived_analysis(user_folders, fecha):
+    """Devuelve (ZipInfo, ruta del ZIP) del análisis de una ejecución archivada, o (None, None)."""
+    if not is_run_id(fecha):
+        return None, None
+    for path in (analysis_path(user_folders, fecha), legacy_analysis_path(user_folders, fecha)):
+        info, bundle = archived_member(user_folders, fecha, f"{RESULTS_FOLDER}/{os.path.basename(path)}")
+        if info is not None:
+            return info, bundle
+    return None, None
+
+
+def analysis_signature(user_folders, fecha):
+    """Cadena que cambia cada vez que se modifica el análisis guardado (suelto o archivado); None si no existe."""
+    path = stored_analysis_path(user_folders, fecha)
+    if path is not None:
+        try:
+            stat = os.stat(path)
+            return f"{path}:{stat.st_mtime_ns}:{stat.st_size}"
+        except FileNotFoundError:
+            pass
+    info, bundle = _archived_analysis(user_folders, fecha)
+    if info is None:
+        return None
+    return f"{bundle}:{info.filename}:{info.CRC}:{info.file_size}"
+
+
+def load_analysis(user_folders, fecha):
+    """Devuelve el análisis guardado de una ejecución (también si está archivada) o None si no existe."""
+    path = stored_analysis_path(user_folders, fecha)
+    try:
+        if path is not None:
+            opener = gzip.open if path.endswith(".gz") else open
+            with opener(path, "rt", encoding="utf-8") as file:
+                stored = json.load(file)
+        else:
+            info, bundle = _archived_analysis(user_folders, fecha)
+            if info is None:
+                return None
+            data = read_archived(user_folders, fecha, info.filename.split("/", 1)[1])
+            stored = json.loads(gzip.decompress(data) if info.filename.endswith(".gz") else data)
+    except FileNotFoundError:
+        return None
+    stored.setdefault("version", 1)
+    return stored
+
+
+@contextmanager
+def run_lock(user_folders, fecha):
+    """Serializa entre hilos y procesos las modificaciones de una ejecución ya guardada (por ejemplo, agregarle CVs)."""
+    path = os.path.join(user_folders.results, f"analysis_{fecha}.lock")
+    with _run_locks_lock:
+        lock = _run_locks.setdefault(path, threading.Lock())
+    with lock, open(path, "a") as lock_file:
+        if fcntl:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def stored_candidates(stored):
+    """Devuelve los candidatos de un análisis guardado como una lista de tuplas (nombre sanitizado, candidato).
+
+    El nombre sanitizado es la clave del candidato dentro de la ejecución (la misma de sus PDFs).
+    """
+    return [
+        (sanitize_filename(candidato.get("nombre", f"Candidato {i+1}")), candidato)
+        for i, candidato in enumerate(stored["analysis"].get("candidatos", []))
+    ]
+
+
+def parse_artifact_filename(filename):
+    """Identifica un PDF generable: devuelve (tipo, fecha, nombre del candidato) o None."""
+    for kind, pattern in (("report", GLOBAL_REPORT_RE), ("combined", COMBINED_RE), ("candidate", CANDIDATE_RE)):
+        match = pattern.match(filename)
+        if match:
+            return kind, match.group("fecha"), match.groupdict().get("cv_name")
+    return None
+
+
+def artifact_etag(user_folders, filename):
+    """ETag de un PDF generable, derivado del análisis guardado; None si el análisis no existe.
+
+    Depende solo del archivo de análisis y del nombre pedido, así que un If-None-Match
+    se puede responder con 304 sin generar el PDF.
+    """
+    artifact = parse_artifact_filename(filename)
+    if artifact is None:
+        return None
+    signature = analysis_signature(user_folders, artifact[1])
+    if signature is None:
+        return None
+    return hashlib.sha1(f"{filename}:{signature}".encode("utf-8")).hexdigest()
+
+
+def _render(filename, stored):
+    import pdf_render  # fpdf se carga recién al generar el primer PDF
+
+    kind, fecha, cv_name = parse_artifact_filename(filename)
+    analysis = stored["analysis"]
+    fecha_title = run_title(fecha)
+    candidates = stored_candidates(stored)
+
+    with timed(f"pdf_render_{kind}"):
+        if kind == "report":
+            return pdf_render.render_global_report(stored["files_names"], stored["job_position"], analysis, fecha_title)
+        if kind == "combined":
+            return pdf_render.render_combined(candidates, fecha_title, stored["files_names"], stored["job_position"], analysis)
+
+        for name, candidato in candidates:
+            if name == cv_name:
+                return pdf_render.render_candidate(candidato, name, fecha_title)
+        return None
+
+
+def render_artifact(user_folders, filename):
+    """Devuelve (bytes del PDF, etag) generándolo desde el análisis guardado, o (None, None) si no existe.
+
+    Los PDFs generados quedan en una cache LRU en memoria por proceso.
+    """
+    etag = artifact_etag(user_folders, filename)
+    if etag is None:
+        return None, None
+
+    cache = get_artifact_cache()
+    key = f"{user_folders.results}:{etag}"
+    pdf_bytes = cache.get(key)
+    if pdf_bytes is None:
+        stored = load_analysis(user_folders, parse_artifact_filename(filename)[1])
+        pdf_bytes = _render(filename, stored) if stored else None
+        if pdf_bytes is None:
+            return None, None
+        cache.set(key, pdf_bytes)
+    return pdf_bytes, etag
+
+
+def artifact_cache_stats():
+    return get_artifact_cache().stats()
@@ -0,0 +1,130 @@
+#Python 3.10
+# -*- coding: utf-8 -*-
+import os
+import random
+import argparse
+
+import pdf_render
+
+FIRST_NAMES = ["Ana", "Bruno", "Carla", "Diego", "Elena", "Facundo", "Gabriela", "Hernán", "Inés", "Julián",
+               "Karina", "Lucas", "María", "Nicolás", "Olivia", "Pablo", "Rocío", "Santiago", "Tamara", "Valentín"]
+LAST_NAMES = ["García", "Fernández", "López", "Martínez", "González", "Rodríguez", "Pérez", "Sánchez", "Romero", "Díaz"]
+SKILLS = ["Python", "SQL", "Spark", "Airflow", "Docker", "Kubernetes", "AWS", "GCP", "Java", "Go", "React",
+          "TypeScript", "Django", "Flask", "Pandas", "Machine Learning", "Power BI", "Excel", "Scrum", "Terraform"]
+POSITIONS = ["Data Engineer", "Backend Developer", "Data Analyst", "DevOps Engineer", "Frontend Developer", "Product Manager"]
+COMPANIES = ["Acme", "Globant", "Mercado Libre", "Despegar", "Accenture", "Banco Galicia", "Naranja X", "Ualá"]
+UNIVERSITIES = ["UBA", "UTN", "ITBA", "UNLP", "Universidad de San Andrés"]
+
+
+def _cv_content(rng, index):
+    """Devuelve (nombre, contacto, secciones) de un CV sintético; cada sección es (título, contenido)."""
+    name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {index}"
+    contact = f"{name} - {name.split()[0].lower()}{index}@mail.com - +54 11 {rng.randint(4000, 6999)}-{rng.randint(1000, 9999)}"
+    skills = rng.sample(SKILLS, rng.randint(4, 10))
+    jobs = [
+        f"- {rng.choice(POSITIONS)} en {rng.choice(COMPANIES)} ({rng.randint(1, 6)} años): "
+        + " ".join(rng.choice(["desarrollo de", "mantenimiento de", "diseño de", "migración de"]) + " " + rng.choice(skills)
+                   for _ in range(rng.randint(3, 8)))
+        for _ in range(rng.randint(2, 6))
+    ]
+    sections = [
+        ("Perfil", f"{rng.choice(POSITIONS)} con {rng.randint(1, 15)} años de experiencia en {', '.join(skills[:3])}."),
+        ("Experiencia", "\n".join(jobs)),
+        ("Educación", f"Ingeniería en Sistemas, {rng.choice(UNIVERSITIES)}, {rng.randint(2000, 2022)}"),
+        ("Habilidades", ", ".join(skills)),
+        ("Idiomas", f"Inglés {rng.choice(['intermedio', 'avanzado'])}"),
+    ]
+    return name, contact, sections
+
+
+def _join_sections(sections):
+    return "\n\n".join(f"{title}\n{content}" for title, content in sections)
+
+
+def synthetic_cv(rng, index):
+    """Devuelve (nombre, páginas) de un CV sintético; cada página es un texto con cabecera y pie como en los CVs reales."""
+    name, contact, sections = _cv_content(rng, index)
+    # Los CVs largos se reparten en varias páginas, repitiendo cabecera y pie
+    lines = _join_sections(sections).splitlines()
+    per_page = 25
+    chunks = [lines[i:i + per_page] for i in range(0, len(lines), per_page)]
+    pages = [f"{contact}\n\n" + "\n".join(chunk) + f"\n\nPágina {i + 1} de {len(chunks)}" for i, chunk in enumerate(chunks)]
+    return name, pages
+
+
+def two_column_cv(rng, index):
+    """Devuelve (nombre, cabecera, columna izquierda, columna derecha) de un CV con barra lateral.
+
+    La barra lateral (izquierda) lleva habilidades e idiomas y la columna principal el
+    perfil, la experiencia y la educación, como en las plantillas de CV habituales.
+    """
+    name, contact, sections = _cv_content(rng, index)
+    sidebar = [section for section in sections if section[0] in ("Habilidades", "Idiomas")]
+    main = [section for section in sections if section not in sidebar]
+    return name, contact, _join_sections(sidebar), _join_sections(main)
+
+
+def expected_text(seed, index, layout="single"):
+    """Texto de un CV del corpus en orden de lectura, para medir la fidelidad de la extracción."""
+    rng = random.Random(f"{seed}:{index}")
+    if layout == "two_column":
+        return "\n\n".join(two_column_cv(rng, index)[1:])
+    return "\n\n".join(synthetic_cv(rng, index)[1])
+
+
+def write_cv_pdf(path, pages):
+    pdf = pdf_render.new_document()  # Reutiliza la fuente DejaVu incluida, cargada una vez por proceso
+    for page in pages:
+        pdf.add_page()
+        pdf.multi_cell(0, 8, page)
+    with open(path, "wb") as file:
+        file.write(pdf.output(dest="S").encode("latin-1"))
+
+
+def write_two_column_pdf(path, header, left, right):
+    """Escribe un CV a dos columnas seguido de una página sin texto, como un anexo escaneado."""
+    pdf = pdf_render.new_document()
+    pdf.add_page()
+    pdf.multi_cell(0, 8, header)
+    top = pdf.get_y() + 4
+    column_width = (pdf.w - pdf.l_margin - pdf.r_margin - 10) / 2
+    pdf.set_xy(pdf.l_margin, top)
+    pdf.multi_cell(column_width, 6, left)
+    pdf.set_xy(pdf.l_margin + column_width + 10, top)
+    pdf.multi_cell(column_width, 6, right)
+    pdf.add_page()
+    pdf.rect(20, 20, pdf.w - 40, pdf.h - 40, style="F")  # Solo gráficos, sin capa de texto
+    with open(path, "wb") as file:
+        file.write(pdf.output(dest="S").encode("latin-1"))
+
+
+def generate_corpus(folder, count, seed=42, offset=0, layout="single"):
+    """Genera ``count`` CVs en PDF en ``folder`` (deterministas para una misma semilla) y devuelve sus rutas.
+
+    Los archivos ya generados se reutilizan. ``offset`` permite generar CVs distintos
+    (por ejemplo uno por cliente concurrente) para que no compartan la cache de textos.
+    ``layout="two_column"`` genera CVs con barra lateral y una página escaneada.
+    """
+    os.makedirs(folder, exist_ok=True)
+    paths = []
+    for index in range(offset, offset + count):
+        prefix = "cv2col" if layout == "two_column" else "cv"
+        path = os.path.join(folder, f"{prefix}_{seed}_{index:05d}.pdf")
+        if not os.path.exists(path):
+            rng = random.Random(f"{seed}:{index}")
+            if layout == "two_column":
+                write_two_column_pdf(path, *two_column_cv(rng, index)[1:])
+            else:
+                write_cv_pdf(path, synthetic_cv(rng, index)[1])
+        paths.append(path)
+    return paths
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Genera un corpus de CVs sintéticos en PDF.")
+    parser.add_argument("folder")
+    parser.add_argument("--count", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--layout", default="single", choices=["single", "two_column"])
+    args = parser.parse_args()
+    print(f"{len(generate_corpus(args.folder, args.count, args.seed, layout=args.layout))} CVs en {args.folder}")
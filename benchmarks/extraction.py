@@ -0,0 +1,116 @@
+#Python 3.10
+# -*- coding: utf-8 -*-
+"""Compara los backends de extracción de texto en velocidad y fidelidad.
+
+Uso (desde la raíz del repositorio):
+
+    python -m benchmarks.extraction                      # 30 CVs de una columna y 30 a dos columnas
+    python -m benchmarks.extraction --cvs 100 --backends pdfium,layout --output extraction.json
+
+La fidelidad se mide contra el texto con que se generó cada CV sintético:
+``recall`` es la fracción de sus palabras que aparecen en el texto extraído y
+``orden`` la similitud de las dos secuencias de palabras (1.0 = mismo orden de
+lectura; baja cuando se mezclan las líneas de dos columnas).
+"""
+import os
+import re
+import sys
+import json
+import argparse
+import tempfile
+import difflib
+from collections import Counter
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAYOUTS = ("single", "two_column")
+
+
+def words(text):
+    return re.findall(r"\w+", text.lower())
+
+
+def fidelity(expected, extracted):
+    """Devuelve (recall, orden) del texto extraído respecto del esperado."""
+    expected_words, extracted_words = words(expected), words(extracted)
+    if not expected_words:
+        return 1.0, 1.0
+    recall = sum((Counter(expected_words) & Counter(extracted_words)).values()) / len(expected_words)
+    order = difflib.SequenceMatcher(None, expected_words, extracted_words, autojunk=False).ratio()
+    return recall, order
+
+
+def compare_backends(corpus, chains):
+    """Extrae el corpus con cada combinación (backend, fallback) y resume velocidad y fidelidad por layout.
+
+    ``corpus`` es una lista de (ruta, layout, texto esperado).
+    """
+    from benchmarks.run import measure, summarize
+    from extraction import extract_pages
+
+    results = {}
+    for backend, fallback in chains:
+        name = f"{backend}+{fallback}" if fallback else backend
+        extracted = {}
+
+        def extract(item):
+            extracted[item[0]] = extract_pages(item[0], backend=backend, fallback=fallback)
+
+        extract_pages(corpus[0][0], backend=backend, fallback=fallback)  # Importa las librerías fuera de la medición
+        samples, elapsed = measure(extract, corpus)
+        total_pages = sum(extracted[path][1] for path, _, _ in corpus)
+        result = dict(summarize(samples, elapsed), pages_per_s=round(total_pages / elapsed, 3) if elapsed else 0.0)
+        for layout in LAYOUTS:
+            scores = [fidelity(expected, "\n".join(extracted[path][0])) for path, kind, expected in corpus if kind == layout]
+            if scores:
+                result[f"recall_{layout}"] = round(sum(score[0] for score in scores) / len(scores), 4)
+                result[f"order_{layout}"] = round(sum(score[1] for score in scores) / len(scores), 4)
+        results[name] = result
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara los backends de extracción de texto de PDFs.")
+    parser.add_argument("--cvs", type=int, default=30, help="CVs sintéticos de cada layout (una columna y dos columnas)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--backends", default=None, help="Lista separada por comas (por defecto todos los disponibles)")
+    parser.add_argument("--workdir", default=None, help="Directorio del corpus (por defecto uno temporal)")
+    parser.add_argument("--output", default=None, help="Archivo JSON de resultados")
+    args = parser.parse_args()
+
+    sys.path.insert(0, REPO_ROOT)
+    from benchmarks.corpus import generate_corpus, expected_text
+    from extraction import BACKENDS
+    from settings import get_settings
+
+    backends = [name.strip() for name in (args.backends or ",".join(BACKENDS)).split(",") if name.strip()]
+    unknown = set(backends) - set(BACKENDS)
+    if unknown:
+        parser.error(f"Backends desconocidos: {', '.join(sorted(unknown))}")
+
+    folder = os.path.join(os.path.abspath(args.workdir or tempfile.mkdtemp(prefix="cv-extraction-")), "corpus")
+    corpus = []
+    for layout in LAYOUTS:
+        paths = generate_corpus(folder, args.cvs, seed=args.seed, layout=layout)
+        corpus.extend((path, layout, expected_text(args.seed, index, layout)) for index, path in enumerate(paths))
+
+    # Cada backend solo y la combinación configurada (backend rápido con reintento por página)
+    chains = [(name, "") for name in backends]
+    settings = get_settings()
+    if settings.pdf_extraction_fallback and settings.pdf_extraction_fallback != settings.pdf_extraction_backend:
+        chains.append((settings.pdf_extraction_backend, settings.pdf_extraction_fallback))
+
+    results = compare_backends(corpus, chains)
+    for name, result in results.items():
+        print(f"{name:<18} p50={result['p50_ms']:>8.1f} ms  p95={result['p95_ms']:>8.1f} ms  {result['pages_per_s']:>8.1f} pág/s  "
+              f"recall={result.get('recall_single', 0):.3f}/{result.get('recall_two_column', 0):.3f}  "
+              f"orden={result.get('order_single', 0):.3f}/{result.get('order_two_column', 0):.3f}")
+    print("(recall y orden: CVs de una columna / a dos columnas)")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump({"parameters": vars(args), "backends": results}, file, indent=2, ensure_ascii=False)
+        print(f"Resultados guardados en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
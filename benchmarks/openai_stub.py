@@ -0,0 +1,142 @@
+#Python 3.10
+# -*- coding: utf-8 -*-
+import re
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+GLOBAL_RESPONSE = {
+    "comparacion_global": {
+        "mejor_cv": "Candidato 1", "peor_cv": "Candidato 2",
+        "razones_mejor_cv": "Experiencia relevante.", "razones_peor_cv": "Poca experiencia.",
+        "habilidades_mas_demandadas": ["Python", "SQL"], "habilidades_menos_comunes": ["Go"],
+        "diferencias_claves": "Años de experiencia y tecnologías.",
+    },
+    "mejor_para_puesto": {"puesto": "Puesto objetivo", "candidato_recomendado": "Candidato 1", "razones": "Mejor ajuste."},
+}
+
+
+def canned_candidate(name, text):
+    """Candidato con el formato que piden los prompts; el puntaje depende del texto para que el ranking varíe."""
+    skills = sorted(set(re.findall(r"\b(Python|SQL|Spark|Airflow|Docker|Kubernetes|AWS|GCP|Java|Go|React)\b", text)))[:8]
+    return {
+        "nombre": name,
+        "perfil_profesional": "Perfil generado por el stub de benchmarks.",
+        "experiencia": [{"puesto": "Developer", "empresa": "Acme", "años_experiencia": "3"}],
+        "habilidades": skills or ["N/A"],
+        "educacion": [{"titulo": "Ingeniería", "institucion": "UBA", "finalizacion": "2020"}],
+        "recomendaciones_puestos": ["Backend Developer"],
+        "industria_recomendada": "Tecnología",
+        "MBTI": "INTJ", "MBTI_explicacion": "Stub.", "MBTI_confianza": "baja",
+        "cursos_sugeridos": [{"curso": "Kubernetes", "razon": "Stub.", "link": "https://example.com"}],
+        "evaluacion": {"puntaje": 40 + len(text) % 60, "comentarios": "Stub.", "pros": ["Stub"], "cons": ["Stub"]},
+    }
+
+
+def canned_response(prompt):
+    """Elige la respuesta según el tipo de prompt: comparación, fase map o fase reduce."""
+    if "Perfiles de los candidatos" in prompt:
+        return GLOBAL_RESPONSE
+    if "Se te proporcionará un CV" in prompt:
+        cv = prompt.split("CV:", 1)[-1].strip()
+        return canned_candidate(cv.splitlines()[0].split(" - ")[0][:60] if cv else "Candidato", cv)
+
+    blocks = re.split(r"^\s*CV: ", prompt.split("Datos de todos los CVs:", 1)[-1], flags=re.MULTILINE)[1:]
+    candidates = [canned_candidate(block.splitlines()[0].rsplit(".", 1)[0], block) for block in blocks]
+    return {"candidatos": candidates, **GLOBAL_RESPONSE}
+
+
+class StubServer(ThreadingHTTPServer):
+    """Servidor HTTP que imita ``/v1/chat/completions`` de OpenAI con latencia configurable.
+
+    ``latency`` y ``jitter`` están en segundos; ``error_rate`` es la fracción de
+    peticiones que responden 429 (para medir los reintentos del cliente).
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.0, jitter=0.0, error_rate=0.0, seed=42):
+        super().__init__(address, StubHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.requests = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        return f"http://{self.server_address[0]}:{self.server_address[1]}/v1"
+
+    def next_delay(self):
+        with self._lock:
+            self.requests += 1
+            fail = self._random.random() < self.error_rate
+            return fail, max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body, headers=()):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        fail, delay = self.server.next_delay()
+        time.sleep(delay)
+        if fail:
+            self._send(429, b'{"error": {"message": "Rate limit (stub)"}}', [("Retry-After", "0")])
+            return
+
+        prompt = payload["messages"][-1]["content"]
+        content = json.dumps(canned_response(prompt), ensure_ascii=False)
+        usage = {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4}
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+
+        if not payload.get("stream"):
+            body = {"model": payload["model"], "choices": [{"message": {"role": "assistant", "content": content}}], "usage": usage}
+            self._send(200, json.dumps(body).encode("utf-8"))
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        events = [json.dumps({"choices": [{"delta": {"content": content[i:i + 40]}}]}) for i in range(0, len(content), 40)]
+        for event in events + ["[DONE]"]:
+            data = f"data: {event}\n\n".encode("utf-8")
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.write(b"0\r\n\r\n")
+
+
+def start_stub(host="127.0.0.1", port=0, **options):
+    """Arranca el stub en un hilo y devuelve el servidor (``server.base_url`` para el cliente)."""
+    server = StubServer((host, port), **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    # Stub independiente para la app completa: OPENAI_API_BASE=http://127.0.0.1:8901/v1 python app.py
+    parser = argparse.ArgumentParser(description="Stub local de la API de chat de OpenAI.")
+    parser.add_argument("--port", type=int, default=8901)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--jitter", type=float, default=0.1)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    server = StubServer(("127.0.0.1", args.port), args.latency, args.jitter, args.error_rate)
+    print(f"Stub de OpenAI en {server.base_url}")
+    server.serve_forever()
@@ -0,0 +1,255 @@
+#Python 3.10
+# -*- coding: utf-8 -*-
+"""Benchmarks de la app contra un stub local de OpenAI.
+
+Uso (desde la raíz del repositorio):
+
+    python -m benchmarks.run                                  # todos los escenarios
+    python -m benchmarks.run --scenarios extraction,pdf_render --cvs 50
+    python -m benchmarks.run --save-baseline                  # guarda benchmarks/baseline.json
+    python -m benchmarks.run --baseline benchmarks/baseline.json --tolerance 0.2
+
+Con ``--baseline`` el proceso termina con código 1 si el p50 o el p95 de algún
+escenario empeora más que ``--tolerance`` respecto de la línea base.
+"""
+import os
+import sys
+import json
+import time
+import platform
+import logging
+import argparse
+import tempfile
+import threading
+import subprocess
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(REPO_ROOT, "benchmarks", "baseline.json")
+SCENARIOS = ("startup", "extraction", "prompt_build", "llm", "pdf_render", "end_to_end")
+
+
+def percentile(sorted_values, fraction):
+    """Percentil por rango más cercano sobre una lista ordenada."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def summarize(samples, elapsed):
+    """Resume las latencias (segundos) de un escenario: percentiles en milisegundos y operaciones por segundo."""
+    values = sorted(samples)
+    return {
+        "count": len(values),
+        "mean_ms": round(sum(values) / len(values) * 1000, 3) if values else 0.0,
+        "p50_ms": round(percentile(values, 0.50) * 1000, 3),
+        "p90_ms": round(percentile(values, 0.90) * 1000, 3),
+        "p95_ms": round(percentile(values, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(values, 0.99) * 1000, 3),
+        "max_ms": round(values[-1] * 1000, 3) if values else 0.0,
+        "throughput_per_s": round(len(values) / elapsed, 3) if elapsed else 0.0,
+    }
+
+
+def measure(function, items, concurrency=1):
+    """Ejecuta ``function(item)`` para cada elemento con ``concurrency`` hilos y devuelve (latencias, tiempo total)."""
+    def timed_call(item):
+        start = time.perf_counter()
+        function(item)
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    if concurrency <= 1:
+        samples = [timed_call(item) for item in items]
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            samples = list(executor.map(timed_call, items))
+    return samples, time.perf_counter() - start
+
+
+def prepare_environment(args, stub_url):
+    """Prepara un directorio de trabajo aislado (usuarios, caches, colas) y la configuración de la app."""
+    os.chdir(args.workdir)
+    with open("chatgpt-api-key.txt", "w") as file:
+        file.write("sk-benchmark")
+    os.environ.update({
+        "OPENAI_API_BASE": stub_url,
+        "OPENAI_API_KEY": "sk-benchmark",
+        "SECRET_KEY": "benchmark",
+        "JOB_WORKERS": str(args.job_workers),
+        "LLM_REQUESTS_PER_MINUTE": "1000000",
+        "LLM_TOKENS_PER_MINUTE": "1000000000",
+    })
+    sys.path.insert(0, REPO_ROOT)
+
+
+def scenario_startup(args, corpus):
+    """Importación en frío de la app en un intérprete nuevo, como cada worker de gunicorn al arrancar."""
+    command = [sys.executable, "-c", f"import sys; sys.path.insert(0, {REPO_ROOT!r}); import app"]
+    return measure(lambda _: subprocess.run(command, check=True), range(args.startup_runs))
+
+
+def scenario_extraction(args, corpus):
+    """Extracción de texto en frío (sin cache) de cada CV con el backend configurado (``PDF_EXTRACTION_BACKEND``, ver ``settings``)."""
+    import utils
+    return measure(utils.extract_text_from_pdf, corpus)
+
+
+def scenario_prompt_build(args, corpus):
+    """Compactación del texto y armado de la clave del prompt para cada CV (sin llamar a OpenAI)."""
+    import utils
+    from compaction import compact_cv_text
+    texts = [utils.extract_text_from_pdf(path) or "" for path in corpus]
+    return measure(lambda text: utils.prompt_cache_key(compact_cv_text(text)), texts)
+
+
+def scenario_llm(args, corpus):
+    """Llamadas a OpenAI (stub) desde varios hilos, con prompts distintos para no usar la cache de respuestas."""
+    import utils
+    prompts = [f"Se te proporcionará un CV. CV:\nBenchmark {time.time()} {i}" for i in range(args.llm_calls)]
+    return measure(utils.execute_prompt, prompts, concurrency=args.concurrency)
+
+
+def scenario_pdf_render(args, corpus):
+    """Generación del PDF de análisis de cada candidato."""
+    import pdf_render
+    from benchmarks.openai_stub import canned_candidate
+    candidates = [canned_candidate(f"Candidato {i}", "Python SQL Spark " * (i % 7 + 1)) for i in range(len(corpus))]
+    return measure(lambda candidato: pdf_render.render_candidate(candidato, candidato["nombre"], "01/01/2025 10:00"), candidates)
+
+
+def scenario_end_to_end(args, corpus_factory):
+    """/analyze completo (subida, cola, extracción, OpenAI, guardado) con varios clientes HTTP concurrentes."""
+    import requests
+    from werkzeug.serving import make_server
+    from app import app
+
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)  # Sin el log de acceso de cada request
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    requests_total = args.concurrency * args.requests_per_client
+    batches = [corpus_factory(args.cvs_per_request, offset=100000 + i * args.cvs_per_request) for i in range(requests_total)]
+
+    def analyze(batch_index):
+        session = requests.Session()
+        session.post(f"{base_url}/login", data={"username": "admin", "password": "admin"})
+        files = [("pdf_files", (os.path.basename(path), open(path, "rb"), "application/pdf")) for path in batches[batch_index]]
+        try:
+            response = session.post(f"{base_url}/analyze", headers={"Accept": "application/json"}, files=files,
+                                    data={"analysis_type": args.analysis_type, "job_position": f"Data Engineer {batch_index}"})
+        finally:
+            for _, (_, file, _) in files:
+                file.close()
+        response.raise_for_status()
+        status_url = base_url + response.json()["status_url"]
+        while True:
+            job = session.get(status_url).json()
+            if job["status"] in ("done", "error"):
+                if job["status"] == "error":
+                    raise RuntimeError(f"Trabajo con error: {job['error']}")
+                return
+            time.sleep(0.05)
+
+    try:
+        return measure(analyze, range(requests_total), concurrency=args.concurrency)
+    finally:
+        server.shutdown()
+
+
+def compare(results, baseline, tolerance):
+    """Devuelve la lista de regresiones (p50/p95 peores que la línea base más la tolerancia)."""
+    regressions = []
+    for name, current in results["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if not previous:
+            continue
+        for metric in ("p50_ms", "p95_ms"):
+            if previous[metric] and current[metric] > previous[metric] * (1 + tolerance):
+                regressions.append(f"{name}.{metric}: {current[metric]} ms (línea base {previous[metric]} ms)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de extracción, prompts, OpenAI, PDFs y /analyze.")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"Lista separada por comas de: {', '.join(SCENARIOS)}")
+    parser.add_argument("--cvs", type=int, default=30, help="CVs sintéticos para los escenarios por CV")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--latency", type=float, default=0.2, help="Latencia del stub de OpenAI en segundos")
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fracción de respuestas 429 del stub")
+    parser.add_argument("--concurrency", type=int, default=4, help="Hilos/clientes concurrentes en llm y end_to_end")
+    parser.add_argument("--llm-calls", type=int, default=40)
+    parser.add_argument("--startup-runs", type=int, default=5, help="Intérpretes nuevos que importan la app")
+    parser.add_argument("--requests-per-client", type=int, default=3)
+    parser.add_argument("--cvs-per-request", type=int, default=5)
+    parser.add_argument("--analysis-type", default="comparison", choices=["comparison", "map_reduce", "prefilter"])
+    parser.add_argument("--job-workers", type=int, default=2)
+    parser.add_argument("--workdir", default=None, help="Directorio de trabajo (por defecto uno temporal)")
+    parser.add_argument("--output", default=None, help="Archivo JSON de resultados")
+    parser.add_argument("--baseline", default=None, help="Línea base con la que comparar")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--save-baseline", action="store_true", help=f"Guarda los resultados en {DEFAULT_BASELINE}")
+    args = parser.parse_args()
+
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"Escenarios desconocidos: {', '.join(sorted(unknown))}")
+
+    args.workdir = os.path.abspath(args.workdir or tempfile.mkdtemp(prefix="cv-bench-"))
+    os.makedirs(args.workdir, exist_ok=True)
+    output = os.path.abspath(args.output) if args.output else None
+    baseline_path = os.path.abspath(args.baseline) if args.baseline else None
+
+    sys.path.insert(0, REPO_ROOT)
+    from benchmarks.openai_stub import start_stub
+    stub = start_stub(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate, seed=args.seed)
+    prepare_environment(args, stub.base_url)
+
+    from benchmarks.corpus import generate_corpus
+    corpus_folder = os.path.join(args.workdir, "corpus")
+    corpus_factory = lambda count, offset=0: generate_corpus(corpus_folder, count, seed=args.seed, offset=offset)
+    corpus = corpus_factory(args.cvs)
+
+    runners = {
+        "startup": lambda: scenario_startup(args, corpus),
+        "extraction": lambda: scenario_extraction(args, corpus),
+        "prompt_build": lambda: scenario_prompt_build(args, corpus),
+        "llm": lambda: scenario_llm(args, corpus),
+        "pdf_render": lambda: scenario_pdf_render(args, corpus),
+        "end_to_end": lambda: scenario_end_to_end(args, corpus_factory),
+    }
+
+    results = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "machine": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        "parameters": {key: value for key, value in vars(args).items() if key not in ("workdir", "output", "baseline", "save_baseline")},
+        "scenarios": {},
+    }
+    for name in scenarios:
+        samples, elapsed = runners[name]()
+        results["scenarios"][name] = summarize(samples, elapsed)
+        summary = results["scenarios"][name]
+        print(f"{name:<13} n={summary['count']:<5} p50={summary['p50_ms']:>9.1f} ms  p95={summary['p95_ms']:>9.1f} ms  "
+              f"p99={summary['p99_ms']:>9.1f} ms  {summary['throughput_per_s']:>8.2f} op/s")
+
+    for path in filter(None, [output, DEFAULT_BASELINE if args.save_baseline else None]):
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2, ensure_ascii=False)
+        print(f"Resultados guardados en {path}")
+
+    if baseline_path:
+        with open(baseline_path, encoding="utf-8") as file:
+            regressions = compare(results, json.load(file), args.tolerance)
+        if regressions:
+            print("Regresiones respecto de la línea base:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+        print("Sin regresiones respecto de la línea base.")
+
+
+if __name__ == "__main__":
+    main()
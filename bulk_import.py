@@ -0,0 +1,234 @@
+#Python 3.10
+# -*- coding: utf-8 -*-
+import os
+import json
+import hashlib
+import shutil
+import zipfile
+import argparse
+import tempfile
+from contextlib import contextmanager
+
+from compaction import compact_cv_text
+from pipeline import save_results
+from settings import get_settings
+from storage import new_run_id
+from uploads import stream_sha256, UploadTooLarge, UPLOAD_CHUNK_SIZE
+from utils import DEFAULT_JOB_POSITION, get_user_folders, extract_texts_from_pdfs, analyze_candidate_profiles, reduce_compared_profiles, file_sha256
+
+IMPORTS_FOLDER = "imports"  # Subcarpeta de uploads con los ZIP subidos
+
+
+def import_id_for(user, source, job_position):
+    """Id estable de una importación: repetir el mismo comando retoma la importación interrumpida."""
+    return hashlib.sha1(f"{user}:{os.path.abspath(source)}:{job_position}".encode("utf-8")).hexdigest()[:16]
+
+
+def checkpoint_path(user_folders, import_id):
+    return os.path.join(user_folders.results, f"import_{import_id}.json")
+
+
+def load_checkpoint(user_folders, import_id):
+    try:
+        with open(checkpoint_path(user_folders, import_id), encoding="utf-8") as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return None
+
+
+def save_checkpoint(user_folders, import_id, checkpoint):
+    path = checkpoint_path(user_folders, import_id)
+    with open(path + ".tmp", "w", encoding="utf-8") as file:
+        json.dump(checkpoint, file, ensure_ascii=False)
+    os.replace(path + ".tmp", path)
+
+
+def resolve_import_directory(directory):
+    """Devuelve la ruta real de una carpeta dentro de ``bulk_import_root`` (configuración) o None si queda fuera."""
+    root = os.path.realpath(get_settings().bulk_import_root)
+    path = os.path.realpath(os.path.join(root, directory))
+    if os.path.commonpath([root, path]) != root or not os.path.isdir(path):
+        return None
+    return path
+
+
+def ingest_source(source):
+    """Registra los PDFs de un ZIP o de una carpeta. Devuelve una tupla (archivos, errores).
+
+    De los miembros del ZIP solo se calcula el hash leyéndolos por bloques, sin
+    escribirlos a disco: cada lote se descomprime al procesarlo (``batch_paths``). Los
+    PDFs de una carpeta se usan en su lugar, calculando solo su hash.
+    """
+    files = []
+    errors = []
+    if zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as archive:
+            for info in archive.infolist():
+                name = os.path.basename(info.filename)
+                if info.is_dir() or info.filename.startswith("__MACOSX/") or not name.lower().endswith(".pdf"):
+                    continue
+                try:
+                    with archive.open(info) as member:
+                        digest, size = stream_sha256(member)
+                except (UploadTooLarge, OSError, zipfile.BadZipFile) as e:
+                    errors.append(f"{info.filename}: {e}")
+                    continue
+                files.append({"name": name, "member": info.filename, "hash": digest})
+    elif os.path.isdir(source):
+        for root, dirs, names in os.walk(source):
+            dirs.sort()
+            for name in sorted(names):
+                if not name.lower().endswith(".pdf"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    files.append({"name": name, "path": path, "hash": file_sha256(path)})
+                except OSError as e:
+                    errors.append(f"{name}: {e}")
+    else:
+        errors.append(f"{source}: no es un archivo ZIP ni una carpeta.")
+    return files, errors
+
+
+@contextmanager
+def batch_paths(source, batch, upload_folder):
+    """Rutas de los PDFs de un lote; los que están dentro del ZIP se descomprimen a una carpeta temporal.
+
+    Solo el lote en curso queda en disco: la carpeta se borra al terminar el lote.
+    """
+    if not any("member" in file for file in batch):
+        yield [file["path"] for file in batch]
+        return
+
+    with tempfile.TemporaryDirectory(dir=upload_folder, prefix="bulk-") as folder, zipfile.ZipFile(source) as archive:
+        paths = []
+        for file in batch:
+            if "member" not in file:
+                paths.append(file["path"])  # Checkpoints anteriores: el PDF ya está en el almacén por contenido
+                continue
+            path = os.path.join(folder, f"{file['hash']}.pdf")
+            try:
+                with archive.open(file["member"]) as member, open(path, "wb") as target:
+                    shutil.copyfileobj(member, target, UPLOAD_CHUNK_SIZE)
+            except (OSError, zipfile.BadZipFile):
+                if os.path.exists(path):
+                    os.remove(path)  # La extracción del lote informa el error de este CV
+            paths.append(path)
+        yield paths
+
+
+def run_bulk_import(user, source, job_position, combined_pdf=False, import_id=None, on_progress=None):
+    """Importa y analiza cientos de CVs de un ZIP o una carpeta en un único ranking.
+
+    Los CVs se procesan por lotes de ``bulk_batch_size`` (extracción en el pool de
+    procesos y fase map en paralelo, como el modo map-reduce) y tras cada lote se guarda
+    un checkpoint en ``results/import_<id>.json``; si la importación se interrumpe,
+    volver a ejecutarla con el mismo id continúa desde el último lote. Los errores de
+    OpenAI no se guardan en el checkpoint para reintentarlos al retomar.
+    ``on_progress(procesados, total)`` se llama después de cada lote. Devuelve una tupla
+    (resultado, error).
+    """
+    settings = get_settings()
+    user_folders = get_user_folders({"user": user})
+    import_id = import_id or import_id_for(user, source, job_position)
+
+    checkpoint = load_checkpoint(user_folders, import_id) or {
+        "source": source,
+        "job_position": job_position,
+        "fecha": new_run_id(),
+        "status": "running",
+        "files": None,
+        "ingest_errors": [],
+        "results": {},  # sha256 -> {"candidato": ...} o {"error": ...}
+    }
+    if checkpoint["status"] == "done":
+        return checkpoint["result"], None
+
+    if checkpoint["files"] is None:
+        files, ingest_errors = ingest_source(source)
+        if not files:
+            return None, "No se encontraron PDFs para importar. " + " ".join(ingest_errors)
+        if len(files) > settings.max_cvs_bulk:
+            return None, f"No se pueden importar más de {settings.max_cvs_bulk} CVs a la vez."
+        checkpoint["files"], checkpoint["ingest_errors"] = files, ingest_errors
+        save_checkpoint(user_folders, import_id, checkpoint)
+
+    results = checkpoint["results"]
+    unique = list({file["hash"]: file for file in checkpoint["files"]}.values())  # Un mismo PDF se analiza una vez
+    pending = [file for file in unique if file["hash"] not in results]
+    analysis_errors = {}
+
+    for start in range(0, len(pending), settings.bulk_batch_size):
+        batch = pending[start:start + settings.bulk_batch_size]
+        try:
+            with batch_paths(checkpoint["source"], batch, user_folders.upload) as paths:
+                extracted = extract_texts_from_pdfs(paths, [file["hash"] for file in batch])
+        except (OSError, zipfile.BadZipFile) as e:
+            return None, f"No se pudo leer el archivo de la importación: {e}"
+
+        cv_files = []
+        cv_texts = []
+        for file, (text, error) in zip(batch, extracted):
+            if error and not text:
+                results[file["hash"]] = {"error": f"{file['name']}: {error}"}
+            else:
+                cv_files.append(file)
+                cv_texts.append((file["name"], compact_cv_text(text)))
+
+        candidatos, errors = analyze_candidate_profiles(cv_texts, job_position)
+        for file, candidato in zip(cv_files, candidatos):
+            if candidato is not None:
+                results[file["hash"]] = {"candidato": candidato}
+        for error in errors:
+            analysis_errors[error.split(":", 1)[0]] = error
+
+        save_checkpoint(user_folders, import_id, checkpoint)
+        if on_progress:
+            on_progress(len(results), len(unique))
+
+    candidatos = [results[file["hash"]]["candidato"] for file in unique if "candidato" in results.get(file["hash"], {})]
+    errors = checkpoint["ingest_errors"] + [results[file["hash"]]["error"] for file in unique if "error" in results.get(file["hash"], {})]
+    errors += list(analysis_errors.values())
+    if not candidatos:
+        return None, "No se pudo analizar ningún CV. " + " ".join(errors)
+
+    comparison, error = reduce_compared_profiles(candidatos, job_position)
+    if error:
+        return None, error
+
+    analysis = {"candidatos": candidatos, **comparison}
+    if errors:
+        analysis["errores_analisis"] = errors
+    result, error = save_results(user_folders, checkpoint["fecha"], analysis, [file["name"] for file in checkpoint["files"]],
+                                 job_position, combined_pdf, [file["hash"] for file in checkpoint["files"]])
+    if error:
+        return None, error
+
+    result["errors"] = errors
+    result["import_id"] = import_id
+    checkpoint["status"], checkpoint["result"] = "done", result
+    save_checkpoint(user_folders, import_id, checkpoint)
+    return result, None
+
+
+def run_bulk_import_job(payload):
+    """Adaptador para la cola de trabajos; si el trabajo se reanuda tras una caída, retoma el checkpoint."""
+    return run_bulk_import(payload["user"], payload["bulk_source"], payload["job_position"],
+                           combined_pdf=payload.get("combined_pdf", False), import_id=payload["import_id"])
+
+
+if __name__ == "__main__":
+    # Importación masiva desde la línea de comandos: python bulk_import.py admin campaña.zip --job-position "Data Engineer"
+    parser = argparse.ArgumentParser(description="Importa y analiza todos los CVs de un ZIP o una carpeta.")
+    parser.add_argument("user")
+    parser.add_argument("source", help="Archivo ZIP o carpeta con los PDFs")
+    parser.add_argument("--job-position", default=DEFAULT_JOB_POSITION)
+    parser.add_argument("--combined-pdf", action="store_true")
+    args = parser.parse_args()
+
+    result, error = run_bulk_import(args.user, args.source, args.job_position, args.combined_pdf,
+                                    on_progress=lambda done, total: print(f"{done}/{total} CVs procesados."))
+    if error:
+        print(f"Error: {error}")
+        raise SystemExit(1)
+    print(f"Ranking {result['fecha']}: {result['candidates']} candidatos, {len(result['errors'])} errores.")
@@ -0,0 +1,180 @@
+#Python 3.10
+# -*- coding: utf-8 -*-
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+CACHE_FOLDER = "cache"
+
+
+class DiskCache:
+    """Cache persistente clave/valor sobre SQLite con límite de tamaño y desalojo LRU.
+
+    Cada entrada guarda su tamaño en bytes y la fecha del último acceso. Cuando el
+    total supera ``max_bytes`` se eliminan las entradas usadas hace más tiempo. Si se
+    indica ``ttl`` (segundos), las entradas más antiguas se consideran caducadas.
+    """
+
+    def __init__(self, path, max_bytes=256 * 1024 * 1024, ttl=None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY,
+                    value BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    last_access REAL NOT NULL,
+                    created REAL NOT NULL DEFAULT 0
+                )"""
+            )
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(entries)")]
+            if "created" not in columns:  # Caches creadas antes de soportar TTL
+                conn.execute("ALTER TABLE entries ADD COLUMN created REAL NOT NULL DEFAULT 0")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_last_access ON entries (last_access)")
+
+    def _connect(self):
+        """Devuelve una conexión por hilo (sqlite3 no permite compartirlas entre hilos)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        """Devuelve el valor asociado a la clave o None, actualizando el último acceso."""
+        conn = self._connect()
+        now = time.time()
+        with conn:
+            row = conn.execute("SELECT value, created FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is not None and self.ttl is not None and now - row[1] > self.ttl:
+                conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                row = None
+            if row is not None:
+                conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (now, key))
+
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return row[0]
+
+    def set(self, key, value):
+        """Guarda un valor (str o bytes) y desaloja entradas antiguas si se supera el límite."""
+        if isinstance(value, str):
+            value = value.encode("utf-8")
+
+        size = len(value)
+        if size > self.max_bytes:
+            return  # Nunca entraría en la cache
+
+        conn = self._connect()
+        now = time.time()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, last_access, created) VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, now, now)
+            )
+            self._evict(conn)
+
+    def _evict(self, conn):
+        """Elimina las entradas caducadas y las menos usadas recientemente hasta volver bajo el límite."""
+        if self.ttl is not None:
+            conn.execute("DELETE FROM entries WHERE created < ?", (time.time() - self.ttl,))
+
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        for key, size in conn.execute("SELECT key, size FROM entries ORDER BY last_access ASC").fetchall():
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def delete(self, key):
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def clear(self):
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM entries")
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """Devuelve contadores de aciertos/fallos y ocupación actual."""
+        conn = self._connect()
+        entries, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": entries,
+                "bytes": total,
+                "max_bytes": self.max_bytes,
+            }
+
+
+class MemoryLRUCache:
+    """Cache LRU en memoria con límite total de bytes, compartida por los hilos del proceso."""
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def set(self, key, value):
+        """Guarda un valor en bytes y desaloja los menos usados recientemente si se supera el límite."""
+        if len(value) > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._size -= len(self._entries.pop(key))
+            self._entries[key] = value
+            self._size += len(value)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def delete(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._size -= len(self._entries.pop(key))
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+            }
@@ -0,0 +1,177 @@
+#Python 3.10
+# -*- coding: utf-8 -*-
+import re
+from collections import Counter
+from functools import lru_cache
+
+from settings import get_settings
+
+TOKENIZER_ENCODING = "o200k_base"  # Codificación de gpt-4o-mini
+PAGE_SEPARATOR = "\f"  # La extracción separa las páginas con un salto de página
+EDGE_LINES = 3  # Líneas del principio y del final de cada página candidatas a cabecera o pie
+MIN_DUPLICATE_CHARS = 20  # Las líneas repetidas más cortas (títulos, viñetas) se conservan
+TRUNCATION_MARK = "[...]"
+
+# Títulos de sección habituales en CVs en español e inglés
+SECTION_TITLES = (
+    "perfil", "resumen", "sobre mi", "objetivo", "experiencia", "experiencia laboral", "experiencia profesional",
+    "educacion", "formacion", "formacion academica", "estudios", "habilidades", "competencias", "conocimientos",
+    "idiomas", "certificaciones", "cursos", "proyectos", "logros", "referencias", "publicaciones", "voluntariado",
+    "datos personales", "contacto", "intereses",
+    "profile", "summary", "about me", "objective", "experience", "work experience", "professional experience",
+    "education", "skills", "languages", "certifications", "courses", "projects", "achievements", "references",
+    "publications", "volunteering", "contact", "interests",
+)
+
+_ACCENTS = str.maketrans("áéíóúüñÁÉÍÓÚÜÑ", "aeiouunAEIOUUN")
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    """Carga el tokenizer de OpenAI si ``tiktoken`` está instalado y sus tablas están disponibles."""
+    try:
+        import tiktoken
+        return tiktoken.get_encoding(TOKENIZER_ENCODING)
+    except Exception:  # Sin tiktoken o sin acceso a la descarga de la codificación
+        return None
+
+
+def count_tokens(text):
+    """Cuenta los tokens de un texto con el tokenizer del modelo (aprox. 4 caracteres por token sin tiktoken)."""
+    encoding = _encoding()
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def _line_key(line):
+    """Clave de comparación de cabeceras y pies: ignora mayúsculas, espacios y números ("Página 2 de 3")."""
+    return re.sub(r"\d+", "#", " ".join(line.lower().split()))
+
+
+def _is_section_title(line):
+    title = line.strip().rstrip(":").translate(_ACCENTS).lower()
+    return len(title) <= 40 and title in SECTION_TITLES
+
+
+def collapse_whitespace(text):
+    """Colapsa espacios y tabulaciones, quita espacios al final de las líneas y deja como máximo una línea en blanco."""
+    lines = [" ".join(line.split()) for line in text.splitlines()]
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip()
+
+
+def remove_repeated_blocks(text):
+    """Quita las cabeceras y pies de página repetidos y las líneas largas duplicadas (bloques de contacto).
+
+    Una línea del borde de una página que aparece en el borde de otras páginas se
+    conserva solo la primera vez; lo mismo con cualquier línea de al menos
+    ``MIN_DUPLICATE_CHARS`` caracteres repetida textualmente.
+    """
+    pages = [page.splitlines() for page in text.split(PAGE_SEPARATOR)]
+
+    edge_counts = Counter()
+    if len(pages) > 1:
+        for lines in pages:
+            content = [line for line in lines if line.strip()]
+            edge_counts.update({_line_key(line) for line in content[:EDGE_LINES] + content[-EDGE_LINES:]})
+    repeated_edges = {key for key, count in edge_counts.items() if count > 1}
+
+    seen = set()
+    result = []
+    for lines in pages:
+        for line in lines:
+            edge_key = _line_key(line)
+            if edge_key in repeated_edges:
+                key = edge_key
+            else:
+                key = " ".join(line.lower().split())  # Las líneas del cuerpo se comparan sin ignorar números
+                if len(key) < MIN_DUPLICATE_CHARS:
+                    result.append(line)
+                    continue
+            if key in seen:
+                continue
+            seen.add(key)
+            result.append(line)
+    return "\n".join(result)
+
+
+def split_sections(text):
+    """Divide un CV en secciones (lista de listas de líneas) a partir de los títulos habituales."""
+    sections = [[]]
+    for line in text.splitlines():
+        if _is_section_title(line) and sections[-1]:
+            sections.append([])
+        sections[-1].append(line)
+    return sections
+
+
+def _allocate(sizes, budget):
+    """Reparte ``budget`` entre secciones: las pequeñas entran enteras y el resto se divide en partes iguales."""
+    allocation = [0] * len(sizes)
+    pending = sorted(range(len(sizes)), key=lambda i: sizes[i])
+    budget = max(budget, 0)
+    while pending:
+        share = budget // len(pending)
+        i = pending[0]
+        if sizes[i] > share:
+            for j in pending:
+                allocation[j] = share
+            break
+        allocation[i] = sizes[i]
+        budget -= sizes[i]
+        pending.pop(0)
+    return allocation
+
+
+def truncate_sections(text, max_tokens):
+    """Recorta el texto a ``max_tokens`` conservando el título de todas las secciones.
+
+    Cada sección se recorta por líneas desde el final, de modo que las secciones
+    largas (por ejemplo una experiencia muy detallada) no desplazan a las cortas.
+    """
+    if not text:
+        return text
+    sections = split_sections(text)
+    line_tokens = [[count_tokens(line + "\n") for line in lines] for lines in sections]
+    mark_tokens = count_tokens(TRUNCATION_MARK + "\n")
+    reserved = sum(tokens[0] + mark_tokens for tokens in line_tokens)  # Título y marca de cada sección
+    allocation = _allocate([sum(tokens[1:]) for tokens in line_tokens], max_tokens - reserved)
+
+    result = []
+    for lines, tokens, budget in zip(sections, line_tokens, allocation):
+        result.append(lines[0])
+        used = 0
+        for line, line_cost in zip(lines[1:], tokens[1:]):
+            if used + line_cost > budget:
+                # Una línea muy larga (texto sin saltos) se corta en proporción a lo que queda
+                keep = len(line) * (budget - used) // line_cost
+                result.append(f"{line[:keep]} {TRUNCATION_MARK}" if keep else TRUNCATION_MARK)
+                break
+            result.append(line)
+            used += line_cost
+    return "\n".join(result)
+
+
+def compact_cv_text(text, max_tokens=None):
+    """Prepara el texto extraído de un CV para el prompt.
+
+    Quita cabeceras, pies y bloques repetidos, colapsa los espacios y, si aún supera
+    ``max_tokens`` (por defecto ``max_tokens_per_cv`` de la configuración), recorta
+    cada sección en lugar de rechazar el CV.
+    """
+    max_tokens = max_tokens or get_settings().max_tokens_per_cv
+    text = collapse_whitespace(remove_repeated_blocks(text))
+    if count_tokens(text) > max_tokens:
+        text = truncate_sections(text, max_tokens)
+    return text
+
+
+def compact_cv_texts(texts, max_tokens=None, max_tokens_per_cv=None):
+    """Compacta varios CVs que van en un mismo prompt repartiendo ``max_tokens`` entre ellos."""
+    if not texts:
+        return []
+    settings = get_settings()
+    max_tokens = max_tokens or settings.max_tokens_comb_cv
+    max_tokens_per_cv = max_tokens_per_cv or settings.max_tokens_per_cv
+    per_cv = min(max_tokens_per_cv, max_tokens // len(texts))
+    return [compact_cv_text(text, per_cv) for text in texts]
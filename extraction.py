@@ -0,0 +1,199 @@
+#Python 3.10
+# -*- coding: utf-8 -*-
+import threading
+
+from settings import get_settings
+
+# pypdfium2 y pdfplumber se importan dentro de cada backend: importar este módulo
+# (cada worker de gunicorn, cada proceso del pool) no los carga.
+
+MIN_PAGE_CHARS = 3  # Una página con menos caracteres visibles se considera sin texto (escaneada o solo imágenes)
+MAX_GARBLED_RATIO = 0.1  # Fracción de caracteres sin mapear (U+FFFD, "(cid:N)") a partir de la cual se reintenta la página
+
+# Detección de columnas del backend "layout"
+GUTTER_SEARCH = (0.3, 0.7)  # Franja horizontal de la página donde se busca el espacio entre columnas
+GUTTER_STEP = 2  # Puntos entre cada posición candidata
+MIN_GUTTER_WIDTH = 12  # Puntos libres alrededor del espacio: más que el espacio entre dos palabras de una línea
+MAX_HEADER_FRACTION = 0.25  # Las palabras que cruzan el espacio solo se admiten en la cabecera
+MIN_COLUMN_WORDS = 5  # Palabras mínimas en cada columna (una barra lateral puede tener pocas)
+
+
+class ExtractionBackend:
+    """Interfaz de los backends de extracción de texto.
+
+    ``extract(pdf_path, indexes)`` devuelve una tupla (textos, total de páginas) con
+    el texto de las páginas pedidas (``range`` o lista de índices, los que pasan del
+    final se ignoran). Una página sin texto devuelve "" y una que no se puede leer
+    devuelve None, en lugar de interrumpir el documento entero.
+    """
+
+    name = None
+
+    def extract(self, pdf_path, indexes):
+        raise NotImplementedError
+
+
+class PdfiumBackend(ExtractionBackend):
+    """Backend rápido: la capa de texto de PDFium, en el orden en que el PDF dibuja el texto."""
+
+    name = "pdfium"
+    _lock = threading.Lock()  # PDFium no admite llamadas concurrentes desde varios hilos de un proceso
+
+    def extract(self, pdf_path, indexes):
+        import pypdfium2
+
+        with self._lock:
+            pdf = pypdfium2.PdfDocument(pdf_path)
+            try:
+                total_pages = len(pdf)
+                texts = []
+                for i in indexes:
+                    if i >= total_pages:
+                        break
+                    try:
+                        page = pdf[i]
+                        textpage = page.get_textpage()
+                        text = textpage.get_text_bounded()
+                        textpage.close()
+                        page.close()
+                    except Exception:
+                        texts.append(None)
+                        continue
+                    texts.append("\n".join(line.rstrip() for line in text.replace("\r\n", "\n").split("\n")))
+            finally:
+                pdf.close()
+        return texts, total_pages
+
+
+class PdfplumberBackend(ExtractionBackend):
+    """Backend de pdfplumber/pdfminer: ordena las líneas por posición en la página."""
+
+    name = "pdfplumber"
+
+    def extract(self, pdf_path, indexes):
+        import pdfplumber
+
+        with pdfplumber.open(pdf_path) as pdf:
+            total_pages = len(pdf.pages)
+            texts = []
+            for i in indexes:
+                if i >= total_pages:
+                    break
+                page = pdf.pages[i]
+                try:
+                    texts.append(self.page_text(page))
+                except Exception:
+                    texts.append(None)
+                page.close()  # Libera los objetos parseados de la página
+        return texts, total_pages
+
+    def page_text(self, page):
+        return page.extract_text() or ""
+
+
+class LayoutBackend(PdfplumberBackend):
+    """Backend lento que respeta el diseño: detecta CVs a dos columnas y lee cada columna entera.
+
+    pdfplumber ordena las líneas por altura, así que en un CV con barra lateral mezcla
+    una línea de cada columna. Este backend busca un espacio vertical sin palabras
+    cerca del centro de la página (las que lo cruzan solo pueden estar en la
+    cabecera) y extrae la cabecera, la columna izquierda y la derecha por separado.
+    """
+
+    name = "layout"
+
+    def page_text(self, page):
+        words = page.extract_words()
+        gutter = find_gutter(words, page.width, page.height)
+        if gutter is None:
+            return page.extract_text() or ""
+
+        x, header_bottom = gutter
+        parts = []
+        if header_bottom > 0:
+            parts.append(page.within_bbox((0, 0, page.width, header_bottom)).extract_text() or "")
+        parts.append(page.within_bbox((0, header_bottom, x, page.height)).extract_text() or "")
+        parts.append(page.within_bbox((x, header_bottom, page.width, page.height)).extract_text() or "")
+        return "\n\n".join(part for part in parts if part.strip())
+
+
+def find_gutter(words, width, height):
+    """Busca el espacio entre dos columnas de palabras (``extract_words`` de pdfplumber).
+
+    Devuelve (x del espacio, fin de la cabecera) o None si la página es de una sola
+    columna. La cabecera (nombre, contacto) puede ocupar todo el ancho siempre que
+    no pase de ``MAX_HEADER_FRACTION`` del alto de la página.
+    """
+    if not words:
+        return None
+
+    best = None
+    for x in range(int(width * GUTTER_SEARCH[0]), int(width * GUTTER_SEARCH[1]), GUTTER_STEP):
+        crossing = [word for word in words if word["x0"] < x + MIN_GUTTER_WIDTH / 2 and word["x1"] > x - MIN_GUTTER_WIDTH / 2]
+        header_bottom = max((word["bottom"] for word in crossing), default=0)
+        if header_bottom > height * MAX_HEADER_FRACTION:
+            continue
+        body = [word for word in words if word["top"] >= header_bottom]
+        left = sum(1 for word in body if word["x1"] <= x)
+        right = len(body) - left
+        if min(left, right) < MIN_COLUMN_WORDS:
+            continue
+        # Entre los candidatos válidos, el de cabecera más corta y más cercano al centro
+        score = (header_bottom, abs(x - width / 2))
+        if best is None or score < best[0]:
+            best = (score, x, header_bottom)
+    return None if best is None else (best[1], best[2])
+
+
+BACKENDS = {backend.name: backend for backend in (PdfiumBackend(), PdfplumberBackend(), LayoutBackend())}
+
+
+def get_backend(name=None):
+    """Devuelve el backend ``name`` (por defecto ``pdf_extraction_backend`` de la configuración)."""
+    name = name or get_settings().pdf_extraction_backend
+    if name not in BACKENDS:
+        raise ValueError(f"Backend de extracción desconocido: {name} (disponibles: {', '.join(BACKENDS)})")
+    return BACKENDS[name]
+
+
+def backend_signature(backend=None, fallback=None):
+    """Identifica la combinación de backends en uso, para no reutilizar textos extraídos con otra."""
+    settings = get_settings()
+    backend = backend or settings.pdf_extraction_backend
+    fallback = settings.pdf_extraction_fallback if fallback is None else fallback
+    return f"{backend}+{fallback}" if fallback and fallback != backend else backend
+
+
+def has_text(text):
+    """Indica si una página tiene texto (las escaneadas o solo con imágenes no tienen)."""
+    return bool(text) and len("".join(text.split())) >= MIN_PAGE_CHARS
+
+
+def is_garbled(text):
+    """Indica si el texto de una página tiene demasiados caracteres sin mapear a Unicode (fuentes sin ToUnicode)."""
+    visible = "".join(text.split())
+    garbled = visible.count("\ufffd") + text.count("(cid:") * len("(cid:N)")
+    return bool(visible) and garbled / len(visible) > MAX_GARBLED_RATIO
+
+
+def extract_pages(pdf_path, start=0, end=None, backend=None, fallback=None):
+    """Extrae el texto de las páginas [start, end) de un PDF con reintento por página.
+
+    Las páginas que ``backend`` no puede leer o cuyo texto queda sin mapear se vuelven
+    a extraer con ``fallback``. Las páginas sin texto (escaneadas o solo con
+    imágenes) se descartan sin reintentar: ningún backend de texto las lee. Devuelve
+    una tupla (textos de las páginas con texto, total de páginas del PDF).
+    """
+    primary = get_backend(backend)
+    fallback = get_settings().pdf_extraction_fallback if fallback is None else fallback
+    # Sin ``end`` se piden todas: los backends cortan en la última página
+    texts, total_pages = primary.extract(pdf_path, range(start, end if end is not None else 1 << 30))
+
+    retry = [i for i, text in enumerate(texts) if text is None or is_garbled(text)]
+    if retry and fallback and fallback != primary.name:
+        retried, _ = get_backend(fallback).extract(pdf_path, [start + i for i in retry])
+        for i, text in zip(retry, retried):
+            if has_text(text) and not is_garbled(text):
+                texts[i] = text
+
+    return [text.strip() for text in texts if has_text(text)], total_pages
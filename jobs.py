@@ -0,0 +1,211 @@
+#Python 3.10
+# -*- coding: utf-8 -*-
+import os
+import json
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+
+from settings import get_settings
+
+JOBS_FOLDER = "jobs"
+JOBS_DB = "jobs.sqlite3"
+JOB_POLL_SECONDS = 1.0  # Intervalo para detectar trabajos encolados por otros procesos
+
+
+class JobQueue:
+    """Cola de trabajos persistente sobre SQLite con un pool de hilos trabajadores.
+
+    Los trabajos se encolan con ``submit`` y se procesan en segundo plano llamando a
+    ``handler(payload)``, que debe devolver una tupla (resultado, error). Como el
+    estado vive en SQLite, varios procesos (por ejemplo workers de gunicorn) pueden
+    compartir la misma cola: cada trabajo se reclama de forma atómica. Sin ``workers``
+    se usa ``job_workers`` de la configuración.
+
+    Cada proceso renueva cada ``heartbeat_seconds`` la marca de vida de sus trabajos en
+    curso; un trabajo "running" que pierde ``job_stale_heartbeats`` renovaciones se
+    considera huérfano (su proceso murió) y los workers de cualquier proceso lo
+    vuelven a encolar.
+    """
+
+    def __init__(self, db_path, handler, workers=None, heartbeat_seconds=None):
+        settings = get_settings()
+        self.db_path = db_path
+        self.handler = handler
+        self.workers = workers or settings.job_workers
+        self.heartbeat_seconds = heartbeat_seconds or settings.job_heartbeat_seconds
+        self.stale_seconds = self.heartbeat_seconds * settings.job_stale_heartbeats
+        self._last_recovery = 0.0
+        self._threads = []
+        self._running = set()  # Trabajos que se están ejecutando en este proceso
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition()
+        self._stopped = threading.Event()
+
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    user TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    result TEXT,
+                    error TEXT,
+                    created REAL NOT NULL,
+                    started REAL,
+                    finished REAL
+                )"""
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status_created ON jobs (status, created)")
+            if "heartbeat" not in {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}:
+                conn.execute("ALTER TABLE jobs ADD COLUMN heartbeat REAL")
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+
+    def start(self):
+        """Arranca los hilos trabajadores (solo la primera vez) y recupera trabajos huérfanos."""
+        with self._lock:
+            if self._threads:
+                return
+
+            self.recover_stale()
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._worker, name=f"job-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            heartbeat = threading.Thread(target=self._heartbeat, name="job-heartbeat", daemon=True)
+            heartbeat.start()
+            self._threads.append(heartbeat)
+
+    def stop(self):
+        """Deja de reclamar trabajos nuevos; los que están en curso terminan (y siguen renovando su marca de vida).
+
+        Los trabajos encolados quedan en SQLite para la cola que reemplace a esta.
+        """
+        self._stopped.set()
+        with self._wakeup:
+            self._wakeup.notify_all()
+
+    def recover_stale(self):
+        """Vuelve a encolar los trabajos "running" cuyo proceso dejó de renovar la marca de vida.
+
+        Un trabajo largo (una importación masiva) que sigue vivo en otro proceso renueva
+        su ``heartbeat`` y no se toca. Devuelve la cantidad de trabajos reencolados.
+        """
+        self._last_recovery = time.monotonic()
+        with self._connect() as conn:
+            return conn.execute(
+                "UPDATE jobs SET status = 'queued', started = NULL, heartbeat = NULL "
+                "WHERE status = 'running' AND COALESCE(heartbeat, started) < ?",
+                (time.time() - self.stale_seconds,)
+            ).rowcount
+
+    def submit(self, user, payload):
+        """Encola un trabajo y devuelve su id inmediatamente."""
+        self.start()
+        job_id = uuid.uuid4().hex
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, user, status, payload, created) VALUES (?, ?, 'queued', ?, ?)",
+                (job_id, user, json.dumps(payload, ensure_ascii=False), time.time())
+            )
+        with self._wakeup:
+            self._wakeup.notify()
+        return job_id
+
+    def get(self, job_id):
+        """Devuelve el estado de un trabajo como diccionario, o None si no existe."""
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        with self._connect() as conn:
+            job["position"] = conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND created < ?", (job["created"],)
+            ).fetchone()[0] if job["status"] == "queued" else 0
+        return job
+
+    def _claim(self):
+        """Marca como 'running' el trabajo encolado más antiguo y lo devuelve (id, payload)."""
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT id, payload FROM jobs WHERE status = 'queued' ORDER BY created LIMIT 1"
+            ).fetchone()
+            if row is not None:
+                conn.execute("UPDATE jobs SET status = 'running', started = ?, heartbeat = ? WHERE id = ?",
+                             (time.time(), time.time(), row[0]))
+            conn.execute("COMMIT")
+            return row
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def _finish(self, job_id, result, error):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished = ? WHERE id = ?",
+                ("error" if error else "done", json.dumps(result, ensure_ascii=False) if result is not None else None,
+                 error, time.time(), job_id)
+            )
+
+    def _heartbeat(self):
+        """Renueva cada ``heartbeat_seconds`` la marca de vida de los trabajos de este proceso."""
+        while True:
+            time.sleep(self.heartbeat_seconds)
+            with self._lock:
+                running = list(self._running)
+            if not running:
+                if self._stopped.is_set():
+                    return
+                continue
+            try:
+                with self._connect() as conn:
+                    conn.execute(
+                        f"UPDATE jobs SET heartbeat = ? WHERE status = 'running' AND id IN ({', '.join('?' * len(running))})",
+                        [time.time()] + running
+                    )
+            except sqlite3.OperationalError as e:
+                print(f"Error al renovar los trabajos en curso: {e}")
+
+    def _worker(self):
+        while not self._stopped.is_set():
+            try:
+                # Además de al arrancar, cada ``heartbeat_seconds`` por si murió otro proceso
+                if time.monotonic() - self._last_recovery >= self.heartbeat_seconds:
+                    self.recover_stale()
+                claimed = self._claim()
+            except sqlite3.OperationalError as e:
+                print(f"Error al leer la cola de trabajos: {e}")
+                claimed = None
+
+            if claimed is None:
+                with self._wakeup:
+                    self._wakeup.wait(JOB_POLL_SECONDS)
+                continue
+
+            job_id, payload = claimed
+            with self._lock:
+                self._running.add(job_id)
+            try:
+                result, error = self.handler(json.loads(payload))
+            except Exception as e:
+                traceback.print_exc()
+                result, error = None, f"Error inesperado durante el análisis: {e}"
+            finally:
+                with self._lock:
+                    self._running.discard(job_id)
+            self._finish(job_id, result, error)
@@ -0,0 +1,82 @@
+#Python 3.10
+# -*- coding: utf-8 -*-
+import json
+
+
+class IncrementalArrayParser:
+    """Extrae objetos de un array JSON a medida que llega el texto por partes.
+
+    Se alimenta con ``feed`` con los fragmentos de la respuesta del modelo y devuelve
+    los objetos del array ``key`` (en el primer nivel del JSON) que ya se cerraron. El
+    texto fuera del JSON, como las marcas ```json, se ignora.
+    """
+
+    def __init__(self, key):
+        self.key = key
+        self._buffer = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = None
+        self._last_string = None
+        self._array_depth = None  # Profundidad del array buscado mientras estamos dentro de él
+        self._object_start = None
+        self.done = False
+
+    def feed(self, chunk):
+        """Procesa un fragmento de texto y devuelve la lista de objetos completos encontrados."""
+        self._buffer += chunk
+        objects = []
+        buffer = self._buffer
+
+        for i in range(self._pos, len(buffer)):
+            char = buffer[i]
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._last_string = buffer[self._string_start + 1:i]
+                continue
+
+            if char == '"':
+                self._in_string = True
+                self._string_start = i
+            elif char in "{[":
+                self._depth += 1
+                if char == "[" and self._depth == 2 and self._array_depth is None and not self.done and self._last_string == self.key:
+                    self._array_depth = self._depth
+                elif char == "{" and self._array_depth is not None and self._depth == self._array_depth + 1:
+                    self._object_start = i
+            elif char in "}]":
+                if char == "}" and self._object_start is not None and self._depth == self._array_depth + 1:
+                    try:
+                        objects.append(json.loads(buffer[self._object_start:i + 1]))
+                    except json.JSONDecodeError:
+                        pass  # Objeto mal formado: la validación final se hace sobre la respuesta completa
+                    self._object_start = None
+                elif char == "]" and self._depth == self._array_depth:
+                    self._array_depth = None
+                    self.done = True
+                self._depth -= 1
+
+        # Descartamos lo ya procesado salvo el objeto o la cadena que aún están abiertos
+        keep_from = len(buffer)
+        if self._object_start is not None:
+            keep_from = self._object_start
+        elif self._in_string:
+            keep_from = self._string_start
+
+        self._buffer = buffer[keep_from:]
+        self._pos = len(buffer) - keep_from
+        if self._object_start is not None:
+            self._object_start -= keep_from
+        if self._string_start is not None:
+            self._string_start -= keep_from
+
+        return objects
@@ -0,0 +1,233 @@
+#Python 3.10
+# -*- coding: utf-8 -*-
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from settings import get_settings
+
+LLM_CONNECT_TIMEOUT = 10
+LLM_BACKOFF_BASE = 1.0
+LLM_BACKOFF_MAX = 30.0
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class LLMError(Exception):
+    """Error de una llamada al modelo. ``retryable`` indica si tiene sentido reintentar."""
+
+    def __init__(self, message, status=None, retryable=False):
+        super().__init__(message)
+        self.status = status
+        self.retryable = retryable
+
+
+class TokenBucket:
+    """Limitador de tasa tipo token bucket: ``rate_per_minute`` unidades que se reponen de forma continua."""
+
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, amount=1, deadline=None):
+        """Consume ``amount`` unidades esperando lo necesario. Devuelve False si se alcanza el plazo."""
+        amount = min(amount, self.capacity)  # Una petición enorme no debe quedar bloqueada para siempre
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return True
+                wait = (amount - self.tokens) / self.rate
+
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return False
+            time.sleep(min(wait, 1.0))
+
+    def adjust(self, amount):
+        """Corrige el consumo una vez conocido el uso real (positivo consume, negativo devuelve)."""
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens - amount)
+
+
+def estimate_tokens(messages):
+    """Estimación rápida de tokens de un prompt (aprox. 4 caracteres por token)."""
+    return sum(len(message.get("content", "")) for message in messages) // 4 + 10 * len(messages)
+
+
+class LLMClient:
+    """Cliente HTTP para la API de chat de OpenAI pensado para muchas llamadas concurrentes.
+
+    Reutiliza conexiones con un pool de ``requests``, limita peticiones y tokens por
+    minuto con dos token buckets compartidos por todos los hilos, reintenta errores
+    429/5xx con backoff exponencial y jitter, y respeta un plazo total por llamada.
+    ``base_url`` puede apuntar a un servidor local para pruebas. Los límites que no
+    se pasan se toman de la configuración (``llm_*`` en ``settings``).
+    """
+
+    def __init__(self, api_key, base_url="https://api.openai.com/v1", requests_per_minute=None,
+                 tokens_per_minute=None, max_retries=None, timeout=None, pool_size=None):
+        settings = get_settings()
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.max_retries = settings.llm_max_retries if max_retries is None else max_retries
+        self.timeout = timeout or settings.llm_timeout
+        self.request_limiter = TokenBucket(requests_per_minute or settings.llm_requests_per_minute)
+        self.token_limiter = TokenBucket(tokens_per_minute or settings.llm_tokens_per_minute)
+        pool_size = pool_size or settings.llm_pool_size
+
+        # requests se importa al crear el cliente (primera llamada al modelo), no al importar el módulo
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="llm")
+
+    def _post(self, path, payload, deadline, stream=False):
+        import requests
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise LLMError("Se agotó el plazo de la llamada al modelo.", retryable=False)
+
+        try:
+            response = self.session.post(
+                f"{self.base_url}{path}",
+                headers={"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"},
+                data=json.dumps(payload),
+                timeout=(min(LLM_CONNECT_TIMEOUT, remaining), remaining),
+                stream=stream,
+            )
+        except (requests.ConnectionError, requests.Timeout) as e:
+            raise LLMError(f"Error de conexión con el modelo: {e}", retryable=True)
+
+        if response.status_code != 200:
+            try:
+                message = response.json().get("error", {}).get("message", response.text)
+            except ValueError:
+                message = response.text
+            error = LLMError(f"HTTP {response.status_code}: {message}", status=response.status_code,
+                             retryable=response.status_code in RETRYABLE_STATUS)
+            error.retry_after = response.headers.get("Retry-After")
+            response.close()
+            raise error
+        return response
+
+    def _backoff(self, attempt, error, deadline):
+        """Espera antes de reintentar. Devuelve False si no queda plazo para otro intento."""
+        delay = random.uniform(0, min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * 2 ** attempt))
+        retry_after = getattr(error, "retry_after", None)
+        if retry_after:
+            try:
+                delay = max(delay, float(retry_after))
+            except ValueError:
+                pass
+
+        if time.monotonic() + delay >= deadline:
+            return False
+        time.sleep(delay)
+        return True
+
+    def _request(self, payload, timeout=None, stream=False):
+        """Envía una petición de chat con limitación de tasa, reintentos y plazo.
+
+        Los tokens estimados se reservan una sola vez por llamada (cada reintento solo
+        cuenta como una petición más) y se devuelven si la llamada falla; quien recibe
+        la respuesta corrige la reserva con el uso real. Devuelve (respuesta, reserva).
+        """
+        deadline = time.monotonic() + (timeout or self.timeout)
+        estimated = estimate_tokens(payload["messages"]) + payload.get("max_tokens", 1000)
+        if not self.token_limiter.acquire(estimated, deadline):
+            raise LLMError("Límite de tasa: no hay capacidad disponible dentro del plazo.", retryable=False)
+
+        try:
+            for attempt in range(self.max_retries + 1):
+                if not self.request_limiter.acquire(1, deadline):
+                    raise LLMError("Límite de tasa: no hay capacidad disponible dentro del plazo.", retryable=False)
+
+                try:
+                    return self._post("/chat/completions", payload, deadline, stream=stream), estimated
+                except LLMError as e:
+                    if not e.retryable or attempt == self.max_retries or not self._backoff(attempt, e, deadline):
+                        raise
+        except LLMError:
+            self.token_limiter.adjust(-estimated)
+            raise
+
+    def chat(self, model, messages, timeout=None, **params):
+        """Ejecuta una petición de chat y devuelve la respuesta JSON con el mismo formato que la API."""
+        response, estimated = self._request({"model": model, "messages": messages, **params}, timeout)
+        try:
+            data = response.json()
+        except ValueError:
+            raise LLMError("Respuesta inválida del modelo.", retryable=False)
+
+        usage = data.get("usage", {}).get("total_tokens")
+        if usage is not None:
+            self.token_limiter.adjust(usage - estimated)
+        return data
+
+    def stream_chat(self, model, messages, timeout=None, **params):
+        """Ejecuta una petición de chat en modo streaming y devuelve un generador con los fragmentos de texto.
+
+        Los errores previos a recibir la respuesta (límites, reintentos, HTTP) se lanzan
+        aquí mismo; los cortes durante la transmisión se lanzan al iterar como LLMError.
+        """
+        response, estimated = self._request({"model": model, "messages": messages, "stream": True, **params}, timeout, stream=True)
+        return self._iter_stream(response, estimated, estimate_tokens(messages))
+
+    def _iter_stream(self, response, estimated, prompt_tokens):
+        """Lee los eventos SSE de la API y devuelve solo el contenido incremental.
+
+        Al terminar (o cortarse) la transmisión corrige la reserva de tokens con el uso
+        informado por la API o, si no lo envía, con la longitud del texto recibido.
+        """
+        import requests
+
+        usage = None
+        received = 0
+        with response:
+            try:
+                for line in response.iter_lines():
+                    line = line.decode("utf-8").strip()
+                    if not line.startswith("data:"):
+                        continue
+
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        break
+                    try:
+                        chunk = json.loads(data)
+                    except ValueError:
+                        raise LLMError("Fragmento inválido en la respuesta del modelo.", retryable=False)
+
+                    usage = (chunk.get("usage") or {}).get("total_tokens", usage)
+                    choices = chunk.get("choices") or [{}]
+                    content = choices[0].get("delta", {}).get("content")
+                    if content:
+                        received += len(content)
+                        yield content
+            except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError) as e:
+                raise LLMError(f"Se interrumpió la respuesta del modelo: {e}", retryable=False)
+            finally:
+                used = usage if usage is not None else prompt_tokens + received // 4
+                self.token_limiter.adjust(used - estimated)
+
+    def submit(self, model, messages, timeout=None, **params):
+        """Versión asíncrona de ``chat``: devuelve un Future que se resuelve con la respuesta."""
+        return self._executor.submit(self.chat, model, messages, timeout, **params)
@@ -0,0 +1,88 @@
+#Python 3.10
+# -*- coding: utf-8 -*-
+from collections import Counter
+
+from search_index import normalize_term
+from settings import get_settings
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# Palabras sin valor para puntuar (español e inglés)
+STOPWORDS = frozenset("""
+a al algo con contra de del desde e el en entre era es esta este esto hacia hasta la las le lo los mas me mi muy no o
+para pero por que se sin sobre su sus tambien te tu un una uno unos y ya
+an and as at be by for from in is it of on or the to with
+""".split())
+
+
+def tokenize(text):
+    """Divide un texto en términos normalizados (minúsculas, sin acentos ni palabras vacías)."""
+    return [word for word in normalize_term(text).split() if len(word) > 1 and word not in STOPWORDS]
+
+
+def query_terms(job_position, skills=""):
+    """Términos de la consulta: las palabras del puesto y de las habilidades pedidas, sin repetir."""
+    terms = tokenize(job_position or "")
+    for skill in (skills or "").split(","):
+        terms.extend(tokenize(skill))
+    return list(dict.fromkeys(terms))
+
+
+def bm25_scores(texts, terms):
+    """Puntúa cada texto contra los términos de la consulta con BM25 (vectorizado con NumPy).
+
+    Solo se cuentan los términos de la consulta, así que el costo es lineal en el
+    tamaño de los CVs. Devuelve un array con un puntaje por texto.
+    """
+    import numpy as np
+
+    if not texts or not terms:
+        return np.zeros(len(texts))
+
+    index = {term: j for j, term in enumerate(terms)}
+    frequencies = np.zeros((len(texts), len(terms)))
+    lengths = np.zeros(len(texts))
+    for i, text in enumerate(texts):
+        tokens = tokenize(text)
+        lengths[i] = len(tokens)
+        for term, count in Counter(tokens).items():
+            j = index.get(term)
+            if j is not None:
+                frequencies[i, j] = count
+
+    documents_with_term = np.count_nonzero(frequencies, axis=0)
+    idf = np.log(1 + (len(texts) - documents_with_term + 0.5) / (documents_with_term + 0.5))
+    norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths / max(lengths.mean(), 1))
+    scores = frequencies * (BM25_K1 + 1) / (frequencies + norm[:, None])
+    return scores @ idf
+
+
+def rank_cvs(cv_texts, job_position, skills=""):
+    """Ordena los CVs por su relevancia para el puesto sin usar OpenAI.
+
+    ``cv_texts`` es una lista de tuplas (nombre de archivo, texto). Devuelve una lista
+    de diccionarios {archivo, puntaje_local, indice}, de mayor a menor puntaje; el
+    puntaje se escala a 0-100 respecto del mejor CV.
+    """
+    import numpy as np
+
+    scores = bm25_scores([text for _, text in cv_texts], query_terms(job_position, skills))
+    top = scores.max() if len(scores) else 0
+    scaled = np.round(scores / top * 100) if top > 0 else np.zeros(len(scores))
+
+    order = np.argsort(-scores, kind="stable")  # A igual puntaje se respeta el orden de subida
+    return [{"archivo": cv_texts[i][0], "puntaje_local": int(scaled[i]), "indice": int(i)} for i in order]
+
+
+def prefilter_cvs(cv_texts, job_position, skills="", top_k=None):
+    """Selecciona los ``top_k`` CVs más relevantes (por defecto ``prefilter_top_k`` de la configuración).
+
+    Devuelve (CVs seleccionados, ranking local completo).
+    """
+    top_k = get_settings().prefilter_top_k if top_k is None else top_k
+    ranking = rank_cvs(cv_texts, job_position, skills)
+    for position, row in enumerate(ranking):
+        row["seleccionado"] = position < top_k
+    selected = sorted(row["indice"] for row in ranking if row["seleccionado"])
+    return [cv_texts[i] for i in selected], ranking
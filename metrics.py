@@ -0,0 +1,146 @@
+#Python 3.10
+# -*- coding: utf-8 -*-
+import json
+import time
+import bisect
+import logging
+import threading
+from contextlib import contextmanager
+
+from settings import get_settings
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+logger = logging.getLogger("metrics")
+if not logger.handlers:  # Solo escribe si ``metrics_request_log`` está activo (ver ``finish_spans``)
+    logger.addHandler(logging.StreamHandler())
+    logger.setLevel(logging.INFO)
+
+_registry = []
+_spans = threading.local()  # Tiempos acumulados por etapa del request o trabajo en curso en este hilo
+
+
+def _format_labels(labelnames, values, extra=()):
+    pairs = list(zip(labelnames, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+class Counter:
+    """Contador monotónico con etiquetas, en formato Prometheus."""
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Histogram:
+    """Histograma con etiquetas (buckets acumulados, suma y cantidad), en formato Prometheus."""
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}  # etiquetas -> [conteos por bucket (+Inf al final), suma]
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            counts, total = self._values.get(key) or ([0] * (len(self.buckets) + 1), 0.0)
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._values[key] = (counts, total + value)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(float(bound))
+                    lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, [('le', le)])} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {total}")
+                lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+STAGE_SECONDS = Histogram("cv_stage_duration_seconds", "Duración de cada etapa del análisis.", ["stage"])
+LLM_REQUEST_SECONDS = Histogram("cv_llm_request_duration_seconds", "Duración de las llamadas a OpenAI por modelo.", ["model", "outcome"])
+LLM_REQUESTS = Counter("cv_llm_requests_total", "Llamadas a OpenAI por modelo y resultado (ok, error, cache).", ["model", "outcome"])
+LLM_TOKENS = Counter("cv_llm_tokens_total", "Tokens consumidos en OpenAI por modelo y tipo.", ["model", "kind"])
+HTTP_REQUEST_SECONDS = Histogram("cv_http_request_duration_seconds", "Duración de los requests HTTP.", ["endpoint", "method", "status"])
+
+
+def record_span(stage, seconds):
+    """Registra la duración de una etapa en el histograma y en los tiempos del request/trabajo en curso."""
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    spans = getattr(_spans, "current", None)
+    if spans is not None:
+        spans[stage] = spans.get(stage, 0.0) + seconds
+
+
+@contextmanager
+def timed(stage):
+    """Mide el bloque como la etapa ``stage``: ``with timed("pdf_extraction"): ...``"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(stage, time.perf_counter() - start)
+
+
+def record_llm_call(model, outcome, seconds=None, usage=None):
+    """Registra una llamada a OpenAI: qué modelo respondió, cuánto tardó y los tokens que informó la API."""
+    LLM_REQUESTS.inc(model=model, outcome=outcome)
+    if seconds is not None:
+        LLM_REQUEST_SECONDS.observe(seconds, model=model, outcome=outcome)
+    for kind in ("prompt_tokens", "completion_tokens"):
+        if usage and usage.get(kind):
+            LLM_TOKENS.inc(usage[kind], model=model, kind=kind.split("_")[0])
+
+
+def start_spans():
+    """Empieza a acumular los tiempos por etapa del hilo actual (un request o un trabajo)."""
+    _spans.current = {}
+
+
+def finish_spans(**fields):
+    """Deja de acumular tiempos y, si ``METRICS_REQUEST_LOG=1``, los escribe como una línea JSON."""
+    spans = getattr(_spans, "current", None)
+    _spans.current = None
+    if spans is not None and get_settings().metrics_request_log:
+        fields["spans"] = {stage: round(seconds, 4) for stage, seconds in spans.items()}
+        logger.info(json.dumps(fields, ensure_ascii=False))
+    return spans
+
+
+def render_metrics():
+    """Devuelve todas las métricas del proceso en el formato de texto de Prometheus.
+
+    Cada proceso (por ejemplo cada worker de gunicorn) expone sus propias métricas.
+    """
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
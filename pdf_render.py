@@ -0,0 +1,141 @@
+#Python 3.10
+# -*- coding: utf-8 -*-
+import os
+import copy
+from functools import lru_cache
+
+from fpdf import FPDF
+
+FONT_FAMILY = "DejaVu"
+FONT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "DejaVuSans.ttf")
+FONT_SIZE = 12
+SEPARATOR = "------------------------------------------------------------------------------------------------------------------"
+
+
+def join_or_na(values):
+    return ", ".join(values or ["N/A"])
+
+
+def _courses(candidato):
+    cursos = candidato.get("cursos_sugeridos", [])
+    if not cursos:
+        return None  # La sección se omite
+    return "\nCursos Sugeridos: " + ", ".join([f"{curso.get('curso', 'N/A')} ({curso.get('link', 'N/A')})" for curso in cursos])
+
+
+def _experience(candidato):
+    return "".join(
+        f"- Puesto: {exp.get('puesto', 'N/A')}\n  Empresa: {exp.get('empresa', 'N/A')}\n  Años de Experiencia: {exp.get('años_experiencia', 'N/A')}\n"
+        for exp in candidato.get("experiencia", [])
+    )
+
+
+def _education(candidato):
+    return "".join(
+        f"- Título: {edu.get('titulo', 'N/A')}\n  Institución: {edu.get('institucion', 'N/A')}\n  Año de Finalización: {edu.get('finalizacion', 'N/A')}\n"
+        for edu in candidato.get("educacion", [])
+    )
+
+
+# Plantillas de maquetado: secuencias de funciones que devuelven cada bloque de texto.
+# Se definen una vez por proceso y el cuerpo se arma con un único join.
+CANDIDATE_TEMPLATE = (
+    lambda c, fecha_title: f"Fecha: {fecha_title}\n\n",
+    lambda c, fecha_title: c.get("perfil_profesional", "N/A"),
+    lambda c, fecha_title: "\n\nHabilidades: " + join_or_na(c.get("habilidades", [])),
+    lambda c, fecha_title: "\n\nPros: " + join_or_na(c.get("evaluacion", {}).get("pros", [])),
+    lambda c, fecha_title: "\n\nCons: " + join_or_na(c.get("evaluacion", {}).get("cons", [])),
+    lambda c, fecha_title: "\n\nExperiencia:\n" + _experience(c),
+    lambda c, fecha_title: "\nEducación:\n" + _education(c),
+    lambda c, fecha_title: "\nRecomendaciones de Puestos: " + join_or_na(c.get("recomendaciones_puestos", [])),
+    lambda c, fecha_title: "\nIndustria Recomendada: " + c.get("industria_recomendada", "N/A"),
+    lambda c, fecha_title: "\nMBTI: " + c.get("MBTI", "N/A"),
+    lambda c, fecha_title: "\nMBTI Explicación: " + c.get("MBTI_explicacion", "N/A"),
+    lambda c, fecha_title: "\nMBTI Confianza: " + c.get("MBTI_confianza", "N/A"),
+    lambda c, fecha_title: _courses(c),
+    lambda c, fecha_title: "\n\nEvaluación:\n",
+    lambda c, fecha_title: f"- Puntaje: {c.get('evaluacion', {}).get('puntaje', 'N/A')}\n",
+    lambda c, fecha_title: f"- Comentarios: {c.get('evaluacion', {}).get('comentarios', 'N/A')}\n",
+    lambda c, fecha_title: "\n" + SEPARATOR,
+)
+
+GLOBAL_REPORT_TEMPLATE = (
+    lambda a, ctx: "Comparación Global de CVs\n",
+    lambda a, ctx: f"Fecha: {ctx['fecha_title']}\n\n",
+    lambda a, ctx: f"Puesto Objetivo: {ctx['job_position']}\n\n",
+    lambda a, ctx: "Archivos Analizados:\n" + "".join(f"- {file}\n" for file in ctx["files_names"]) + "\n",
+    lambda a, ctx: "Nombres de los Candidatos:\n" + "\n".join([f"{i+1}. {candidato.get('nombre', 'Candidato')}" for i, candidato in enumerate(a["candidatos"])]) + "\n\n",
+    lambda a, ctx: f"Mejor CV: {a['comparacion_global']['mejor_cv']}\n",
+    lambda a, ctx: f"Peor CV: {a['comparacion_global']['peor_cv']}\n",
+    lambda a, ctx: f"Razones Mejor CV: {a['comparacion_global']['razones_mejor_cv']}\n",
+    lambda a, ctx: f"Razones Peor CV: {a['comparacion_global']['razones_peor_cv']}\n",
+    lambda a, ctx: f"Habilidades Más Demandadas: {', '.join(a['comparacion_global']['habilidades_mas_demandadas'])}\n",
+    lambda a, ctx: f"Habilidades Menos Comunes: {', '.join(a['comparacion_global']['habilidades_menos_comunes'])}\n",
+    lambda a, ctx: f"Diferencias Claves: {a['comparacion_global']['diferencias_claves']}\n",
+    lambda a, ctx: "\n" + SEPARATOR,
+)
+
+
+def render_template_text(template, data, context):
+    """Arma el cuerpo de texto de una plantilla; los bloques que devuelven None se omiten."""
+    return "".join(block for block in (section(data, context) for section in template) if block is not None)
+
+
+@lru_cache(maxsize=1)
+def _font_entries():
+    """Carga la fuente DejaVu una sola vez por proceso y devuelve las entradas que FPDF guarda por documento."""
+    pdf = FPDF()
+    pdf.add_font(FONT_FAMILY, "", FONT_PATH, uni=True)
+    fontkey = FONT_FAMILY.lower()
+    return pdf.fonts[fontkey], {key: value for key, value in pdf.font_files.items()}
+
+
+def new_document():
+    """Crea un FPDF con la fuente UTF-8 ya registrada, sin volver a leer ni parsear el archivo de la fuente."""
+    font, font_files = _font_entries()
+    pdf = FPDF()
+    # Cada documento necesita su propia copia: FPDF guarda en 'subset' los caracteres usados
+    pdf.fonts[FONT_FAMILY.lower()] = dict(font, i=len(pdf.fonts) + 1, subset=list(font["subset"]))
+    pdf.font_files.update(copy.deepcopy(font_files))
+    pdf.set_font(FONT_FAMILY, "", FONT_SIZE)
+    return pdf
+
+
+def _add_page(pdf, title, body):
+    pdf.add_page()
+    pdf.cell(200, 10, title, ln=True, align="C")
+    pdf.ln(10)
+    pdf.multi_cell(0, 10, body)
+
+
+def _output(pdf):
+    return pdf.output(dest="S").encode("latin-1")
+
+
+def render_candidate(candidato, cv_name, fecha_title):
+    """Devuelve los bytes del PDF de análisis de un candidato."""
+    pdf = new_document()
+    _add_page(pdf, f"Análisis de CV - {cv_name}", render_template_text(CANDIDATE_TEMPLATE, candidato, fecha_title))
+    return _output(pdf)
+
+
+def render_global_report(files_names, job_position, analysis, fecha_title):
+    """Devuelve los bytes del PDF con la comparación global de los CVs."""
+    context = {"files_names": files_names, "job_position": job_position, "fecha_title": fecha_title}
+    pdf = new_document()
+    _add_page(pdf, "Análisis Global de CVs", render_template_text(GLOBAL_REPORT_TEMPLATE, analysis, context))
+    return _output(pdf)
+
+
+def render_combined(candidates, fecha_title, files_names=None, job_position=None, analysis=None):
+    """Devuelve un único PDF con una página por candidato y, si se indica ``analysis``, el reporte global al final.
+
+    ``candidates`` es una lista de tuplas (nombre de archivo del candidato, candidato).
+    """
+    pdf = new_document()
+    for cv_name, candidato in candidates:
+        _add_page(pdf, f"Análisis de CV - {cv_name}", render_template_text(CANDIDATE_TEMPLATE, candidato, fecha_title))
+    if analysis is not None:
+        context = {"files_names": files_names or [], "job_position": job_position, "fecha_title": fecha_title}
+        _add_page(pdf, "Análisis Global de CVs", render_template_text(GLOBAL_REPORT_TEMPLATE, analysis, context))
+    return _output(pdf)
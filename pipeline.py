@@ -0,0 +1,198 @@
+#Python 3.10
+# -*- coding: utf-8 -*-
+from ranking_store import get_ranking_store, parse_score
+from artifacts import save_analysis, load_analysis, run_lock, stored_candidates
+from compaction import compact_cv_text, compact_cv_texts
+from local_scoring import prefilter_cvs
+from metrics import timed
+from utils import extract_texts_from_pdfs, analyze_compared_cv, analyze_map_reduce_cv, load_candidates_ranking, get_user_folders
+from utils import analyze_candidate_profiles, reduce_compared_profiles
+from utils import sanitize_filename, candidate_pdf_filename, combined_pdf_filename, global_report_filename, DEFAULT_JOB_POSITION
+
+
+def run_analysis(user, analysis_type, files_names, files_paths, job_position, fecha, on_candidate=None, combined_pdf=False,
+                 files_hashes=None, skills=""):
+    """Ejecuta el análisis completo de un lote de CVs ya guardados en disco.
+
+    Extrae el texto, lo compacta al presupuesto de tokens, consulta a OpenAI y guarda el
+    análisis y el ranking; los PDFs por candidato y el reporte global se generan recién
+    cuando se descargan. Devuelve una tupla (resultado, error); el resultado incluye la
+    fecha del ranking, el nombre del reporte y los errores por archivo. ``on_candidate``
+    se llama con cada candidato en cuanto el modelo lo devuelve (modo streaming). Con
+    ``combined_pdf`` el ranking enlaza a un único PDF con todos los candidatos.
+    ``files_hashes`` son los SHA-256 calculados al subir los archivos, si se conocen.
+    El tipo ``prefilter`` puntúa todos los CVs localmente contra el puesto y las
+    ``skills`` indicadas y solo compara con OpenAI los mejores.
+    """
+    user_folders = get_user_folders({"user": user})
+    errors = []
+    cv_texts = []  # Pares (archivo, texto)
+
+    # Extraemos el texto de todos los CVs en paralelo, conservando el orden de subida
+    for file_name, (text, error) in zip(files_names, extract_texts_from_pdfs(files_paths, files_hashes)):
+        if error:
+            errors.append(f"{file_name}: {error}")
+        if text:
+            cv_texts.append((file_name, text))
+
+    if not cv_texts:
+        return None, "No se pudo extraer texto de ningún CV. " + " ".join(errors)
+
+    preselection = None
+    if analysis_type == "prefilter":
+        # Filtro local sin OpenAI: solo los CVs más relevantes para el puesto pasan a la comparación.
+        # Sin puesto se busca solo por habilidades: el texto por defecto no es parte de la consulta.
+        query_position = "" if job_position == DEFAULT_JOB_POSITION else job_position
+        with timed("prefilter"):
+            cv_texts, preselection = prefilter_cvs(cv_texts, query_position, skills)
+        analysis_type = "comparison"
+
+    # Compactamos los textos (cabeceras repetidas, espacios, recorte por secciones) según el presupuesto de tokens
+    with timed("compaction"):
+        if analysis_type == "comparison":
+            compacted = compact_cv_texts([text for file_name, text in cv_texts])
+        else:
+            compacted = [compact_cv_text(text) for file_name, text in cv_texts]
+    cv_texts = [(file_name, text) for (file_name, _), text in zip(cv_texts, compacted)]
+    all_cv_texts = ["CV: {filename}\n{text}".format(filename=file_name, text=text) for file_name, text in cv_texts]
+
+    if analysis_type == "comparison":
+        # Enviar el texto combinado a OpenAI para análisis de comparación
+        analysis, error = analyze_compared_cv("\n".join(all_cv_texts), job_position, on_candidate)
+    elif analysis_type == "map_reduce":
+        analysis, error = analyze_map_reduce_cv(cv_texts, job_position, on_candidate)
+    else:
+        return None, "Funcion no implementada."
+
+    if error:
+        return None, error
+
+    errors.extend(analysis.get("errores_analisis", []))
+    if preselection is not None:
+        analysis["preseleccion"] = preselection
+
+    result, error = save_results(user_folders, fecha, analysis, files_names, job_position, combined_pdf, files_hashes)
+    if error:
+        return None, error
+
+    result["errors"] = errors
+    result["discarded"] = sum(1 for row in preselection or [] if not row["seleccionado"])
+    return result, None
+
+
+def save_results(user_folders, fecha, analysis, files_names, job_position, combined_pdf=False, files_hashes=None):
+    """Guarda el análisis y su ranking ordenado por puntaje. Devuelve una tupla (resultado, error)."""
+    # Los PDFs se generan bajo demanda en /download a partir del análisis guardado
+    candidates_names = [sanitize_filename(candidato.get("nombre", f"Candidato {i+1}")) for i, candidato in enumerate(analysis.get("candidatos", []))]
+    if combined_pdf:
+        pdf_paths = {cv_name: combined_pdf_filename(fecha) for cv_name in candidates_names}
+    else:
+        pdf_paths = {cv_name: candidate_pdf_filename(cv_name, fecha) for cv_name in candidates_names}
+    rankings = load_candidates_ranking(analysis, [], pdf_paths)
+    if not rankings:
+        return None, "No se encontraron candidatos en el análisis."
+
+    with timed("analysis_save"):
+        save_analysis(user_folders, fecha, analysis, files_names, job_position, files_hashes)
+    report_filename = global_report_filename(fecha)
+
+    # Guardar el ranking ordenado por puntaje en el almacén del usuario
+    rankings.sort(key=lambda row: parse_score(row["puntaje"]) or 0, reverse=True)
+    with timed("ranking_save"):
+        get_ranking_store(user_folders).save_run(fecha, rankings, job_position, report_filename)
+
+    return {
+        "fecha": fecha,
+        "report_filename": report_filename,
+        "candidates": len(rankings),
+    }, None
+
+
+def run_append(user, fecha, files_names, files_paths, files_hashes=None, on_candidate=None):
+    """Agrega CVs a una ejecución ya guardada sin volver a analizar los que ya tenía.
+
+    Solo los CVs nuevos pasan por OpenAI (un prompt por CV, como la fase map); los
+    candidatos guardados se reutilizan tal cual y luego se recalcula la comparación
+    global sobre los perfiles compactos de todos. El análisis, el ranking y el reporte
+    de ``fecha`` se actualizan en el mismo lugar. Los PDFs que ya estaban en la
+    ejecución se omiten. Devuelve una tupla (resultado, error) como ``run_analysis``.
+    """
+    user_folders = get_user_folders({"user": user})
+    with run_lock(user_folders, fecha):
+        stored = load_analysis(user_folders, fecha)
+        if stored is None:
+            return None, "No se encontró el análisis de esa ejecución."
+        job_position = stored["job_position"]
+        known_hashes = set(stored.get("files_hashes") or [])
+
+        skipped = []
+        new_files = []  # Tuplas (archivo, ruta, hash)
+        for i, (file_name, path) in enumerate(zip(files_names, files_paths)):
+            digest = files_hashes[i] if files_hashes else None
+            if digest and digest in known_hashes:
+                skipped.append(f"{file_name}: ya forma parte de esta ejecución.")
+                continue
+            new_files.append((file_name, path, digest))
+        if not new_files:
+            return None, "Los CVs subidos ya forman parte de esta ejecución."
+
+        errors = []
+
+        cv_texts = []
+        digests = [digest for _, _, digest in new_files]
+        extracted = extract_texts_from_pdfs([path for _, path, _ in new_files], digests if all(digests) else None)
+        for (file_name, _, _), (text, error) in zip(new_files, extracted):
+            if error:
+                errors.append(f"{file_name}: {error}")
+            if text:
+                cv_texts.append((file_name, text))
+        if not cv_texts:
+            return None, "No se pudo extraer texto de ningún CV. " + " ".join(errors)
+
+        with timed("compaction"):
+            cv_texts = [(file_name, compact_cv_text(text)) for file_name, text in cv_texts]
+        nuevos, analysis_errors = analyze_candidate_profiles(cv_texts, job_position, on_candidate)
+        errors.extend(analysis_errors)
+        nuevos = [candidato for candidato in nuevos if candidato is not None]
+        if not nuevos:
+            return None, "No se pudo analizar ningún CV. " + " ".join(errors)
+
+        # Nombres repetidos generarían el mismo PDF: se distinguen con un sufijo
+        names = {cv_name for cv_name, _ in stored_candidates(stored)}
+        for candidato in nuevos:
+            nombre, suffix = candidato["nombre"], 2
+            while sanitize_filename(candidato["nombre"]) in names:
+                candidato["nombre"], suffix = f"{nombre} ({suffix})", suffix + 1
+            names.add(sanitize_filename(candidato["nombre"]))
+
+        analysis = stored["analysis"]
+        candidatos = analysis.get("candidatos", []) + nuevos
+        comparison, error = reduce_compared_profiles(candidatos, job_position)
+        if error:
+            return None, error
+        analysis.update(comparison)
+        analysis["candidatos"] = candidatos
+        if errors:
+            analysis["errores_analisis"] = analysis.get("errores_analisis", []) + errors
+
+        rankings = get_ranking_store(user_folders).get_rankings(fecha)
+        combined_pdf = bool(rankings) and all(row.get("PDF") == combined_pdf_filename(fecha) for row in rankings)
+        files_hashes = (stored.get("files_hashes") or []) + digests if stored.get("files_hashes") and all(digests) else None
+        result, error = save_results(user_folders, fecha, analysis, stored["files_names"] + [name for name, _, _ in new_files],
+                                     job_position, combined_pdf, files_hashes)
+        if error:
+            return None, error
+
+    result["errors"] = skipped + errors
+    result["added"] = len(nuevos)
+    return result, None
+
+
+def run_analysis_job(payload):
+    """Adaptador para la cola de trabajos: recibe el payload guardado al encolar el análisis."""
+    if payload.get("append_to"):
+        return run_append(payload["user"], payload["append_to"], payload["files_names"], payload["files_paths"],
+                          files_hashes=payload.get("files_hashes"))
+    return run_analysis(payload["user"], payload["analysis_type"], payload["files_names"],
+                        payload["files_paths"], payload["job_position"], payload["fecha"],
+                        combined_pdf=payload.get("combined_pdf", False), files_hashes=payload.get("files_hashes"), skills=payload.get("skills", ""))
@@ -0,0 +1,399 @@
+#Python 3.10
+# -*- coding: utf-8 -*-
+import os
+import csv
+import json
+import sqlite3
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+from search_index import index_terms, parse_query, clause_sql
+
+RANKINGS_DB = "rankings.sqlite3"
+SUMMARY_FIELDS = ("nombre", "puntaje", "industria", "MBTI", "Habilidades", "PDF")  # Columnas de las vistas de lista
+SORT_COLUMNS = {"puntaje": "c.puntaje", "nombre": "c.nombre COLLATE NOCASE", "industria": "c.industria COLLATE NOCASE"}
+HISTOGRAM_BINS = 10  # Tramos de 10 puntos entre 0 y 100
+TOP_SKILLS = 20
+RANKING_MAX_PAGE_SIZE = 200
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def parse_score(value):
+    """Convierte un puntaje a número; devuelve None si no es numérico (por ejemplo "N/A")."""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def summary_row(row):
+    """Proyección de una fila del ranking a las columnas de las vistas de lista."""
+    return {field: row.get(field) for field in SUMMARY_FIELDS}
+
+
+def compute_aggregates(rankings):
+    """Resumen de una ejecución: histograma de puntajes, habilidades más frecuentes y candidatos por industria."""
+    scores = [score for score in (parse_score(row.get("puntaje")) for row in rankings) if score is not None]
+    histogram = [0] * HISTOGRAM_BINS
+    for score in scores:
+        histogram[min(max(int(score * HISTOGRAM_BINS // 100), 0), HISTOGRAM_BINS - 1)] += 1
+
+    skills = Counter()
+    industries = Counter()
+    for row in rankings:
+        skills.update({skill.strip() for skill in (row.get("Habilidades") or "").split(",")} - {"", "N/A"})
+        industries[row.get("industria") or "N/A"] += 1
+
+    width = 100 // HISTOGRAM_BINS
+    return {
+        "candidates": len(rankings),
+        "scored": len(scores),
+        "mean_score": round(sum(scores) / len(scores), 1) if scores else None,
+        "score_histogram": [{"min": i * width, "max": (i + 1) * width, "count": count} for i, count in enumerate(histogram)],
+        "top_skills": [{"skill": skill, "count": count} for skill, count in skills.most_common(TOP_SKILLS)],
+        "industries": [{"industria": industria, "count": count} for industria, count in industries.most_common()],
+    }
+
+
+def fts_query(text):
+    """Convierte un texto libre en una consulta FTS5 de prefijos: "pyth sql" -> "pyth"* AND "sql"*."""
+    words = [word.replace('"', '') for word in text.replace(",", " ").split()]
+    return " AND ".join(f'"{word}"*' for word in words if word)
+
+
+class RankingStore:
+    """Almacén de rankings de un usuario sobre SQLite.
+
+    Sustituye a los CSV por ejecución: cada análisis (``fecha``) es una fila en ``runs``
+    y cada candidato una fila en ``candidates`` con índices por puntaje, industria y
+    fecha, más un índice FTS5 sobre las habilidades. La fila completa del ranking se
+    guarda como JSON para devolverla tal cual a las plantillas y a la API.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._local = threading.local()
+
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        conn = self._connect()
+        with conn:
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS runs (
+                    fecha TEXT PRIMARY KEY,
+                    job_position TEXT,
+                    report_filename TEXT,
+                    candidates INTEGER NOT NULL DEFAULT 0,
+                    created REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS candidates (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    fecha TEXT NOT NULL REFERENCES runs (fecha) ON DELETE CASCADE,
+                    nombre TEXT,
+                    puntaje REAL,
+                    industria TEXT,
+                    mbti TEXT,
+                    habilidades TEXT,
+                    data TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_candidates_fecha_puntaje ON candidates (fecha, puntaje DESC);
+                CREATE INDEX IF NOT EXISTS idx_candidates_puntaje ON candidates (puntaje);
+                CREATE INDEX IF NOT EXISTS idx_candidates_industria ON candidates (industria COLLATE NOCASE);
+                CREATE INDEX IF NOT EXISTS idx_runs_created ON runs (created);
+                CREATE VIRTUAL TABLE IF NOT EXISTS candidates_fts USING fts5 (
+                    habilidades, content='candidates', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+                );
+                CREATE TRIGGER IF NOT EXISTS candidates_ai AFTER INSERT ON candidates BEGIN
+                    INSERT INTO candidates_fts (rowid, habilidades) VALUES (new.id, new.habilidades);
+                END;
+                CREATE TRIGGER IF NOT EXISTS candidates_ad AFTER DELETE ON candidates BEGIN
+                    INSERT INTO candidates_fts (candidates_fts, rowid, habilidades) VALUES ('delete', old.id, old.habilidades);
+                END;
+                CREATE TABLE IF NOT EXISTS terms (
+                    term TEXT NOT NULL,
+                    field TEXT NOT NULL,
+                    candidate_id INTEGER NOT NULL REFERENCES candidates (id) ON DELETE CASCADE
+                );
+                CREATE INDEX IF NOT EXISTS idx_terms_term ON terms (term, field, candidate_id);
+                CREATE INDEX IF NOT EXISTS idx_terms_candidate ON terms (candidate_id);
+                CREATE INDEX IF NOT EXISTS idx_candidates_puntaje_fecha ON candidates (puntaje DESC, fecha DESC);
+                CREATE TABLE IF NOT EXISTS meta (
+                    key TEXT PRIMARY KEY,
+                    value TEXT
+                );
+                """
+            )
+            if not conn.execute("SELECT value FROM meta WHERE key = 'terms_indexed'").fetchone():
+                # Almacenes creados antes del índice de búsqueda: se indexan sus candidatos una vez
+                for candidate_id, data in conn.execute("SELECT id, data FROM candidates").fetchall():
+                    self._index_candidate(conn, candidate_id, json.loads(data))
+                conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('terms_indexed', ?)", (str(time.time()),))
+            if "updated" not in {row[1] for row in conn.execute("PRAGMA table_info(runs)")}:
+                # Última modificación de cada ejecución, para las respuestas condicionales de la API
+                conn.execute("ALTER TABLE runs ADD COLUMN updated REAL")
+                conn.execute("UPDATE runs SET updated = created")
+            if "aggregates" not in {row[1] for row in conn.execute("PRAGMA table_info(runs)")}:
+                # Resumen precalculado de cada ejecución; el de las anteriores se calcula al pedirlo por primera vez
+                conn.execute("ALTER TABLE runs ADD COLUMN aggregates TEXT")
+            if "summary" not in {row[1] for row in conn.execute("PRAGMA table_info(candidates)")}:
+                # Proyección de cada fila a las columnas de las vistas de lista, sin los textos largos
+                conn.execute("ALTER TABLE candidates ADD COLUMN summary TEXT")
+                fields = ", ".join(f"'{field}', json_extract(data, '$.{field}')" for field in SUMMARY_FIELDS)
+                conn.execute(f"UPDATE candidates SET summary = json_object({fields})")
+
+    def _connect(self):
+        """Devuelve una conexión por hilo (sqlite3 no permite compartirlas entre hilos)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    def save_run(self, fecha, rankings, job_position=None, report_filename=None, created=None):
+        """Guarda (o reemplaza) el ranking completo de una ejecución junto con su resumen (``compute_aggregates``)."""
+        conn = self._connect()
+        now = time.time()
+        aggregates = json.dumps(compute_aggregates(rankings), ensure_ascii=False)
+        with conn:
+            conn.execute("DELETE FROM candidates WHERE fecha = ?", (fecha,))
+            conn.execute(
+                "INSERT OR REPLACE INTO runs (fecha, job_position, report_filename, candidates, created, updated, aggregates) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (fecha, job_position, report_filename, len(rankings), created or now, now, aggregates)
+            )
+            for row in rankings:
+                cursor = conn.execute(
+                    "INSERT INTO candidates (fecha, nombre, puntaje, industria, mbti, habilidades, data, summary) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (fecha, row.get("nombre"), parse_score(row.get("puntaje")), row.get("industria"), row.get("MBTI"),
+                     row.get("Habilidades"), json.dumps(row, ensure_ascii=False), json.dumps(summary_row(row), ensure_ascii=False))
+                )
+                self._index_candidate(conn, cursor.lastrowid, row)
+
+    def _index_candidate(self, conn, candidate_id, row):
+        """Agrega los términos de búsqueda de un candidato al índice invertido."""
+        conn.executemany(
+            "INSERT INTO terms (term, field, candidate_id) VALUES (?, ?, ?)",
+            [(term, field, candidate_id) for field, term in index_terms(row)]
+        )
+
+    def has_run(self, fecha):
+        return self._connect().execute("SELECT 1 FROM runs WHERE fecha = ?", (fecha,)).fetchone() is not None
+
+    def get_run(self, fecha):
+        """Devuelve los metadatos de una ejecución o None si no existe."""
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT fecha, job_position, report_filename, candidates, created, updated FROM runs WHERE fecha = ?", (fecha,)
+        ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("fecha", "job_position", "report_filename", "candidates", "created", "updated"), row))
+
+    def list_runs(self):
+        """Lista las ejecuciones del usuario, de la más reciente a la más antigua."""
+        conn = self._connect()
+        return [
+            dict(zip(("fecha", "job_position", "report_filename", "candidates", "created"), row))
+            for row in conn.execute(
+                "SELECT fecha, job_position, report_filename, candidates, created FROM runs ORDER BY substr(fecha, 1, 12) DESC, created DESC"
+            )
+        ]
+
+    def _rankings_where(self, fecha, min_score=None, max_score=None, industry="", skills=""):
+        """Condiciones SQL (y sus parámetros) de los filtros del ranking de una ejecución."""
+        where = ["c.fecha = ?"]
+        params = [fecha]
+
+        if min_score is not None:
+            where.append("c.puntaje >= ?")
+            params.append(min_score)
+        if max_score is not None:
+            where.append("c.puntaje <= ?")
+            params.append(max_score)
+        if industry:
+            # Subcadena literal: se escapan los comodines de LIKE que traiga el texto
+            escaped = industry.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            where.append("c.industria LIKE ? ESCAPE '\\'")
+            params.append(f"%{escaped}%")
+        if skills and fts_query(skills):
+            where.append("c.id IN (SELECT rowid FROM candidates_fts WHERE candidates_fts MATCH ?)")
+            params.append(fts_query(skills))
+        return " AND ".join(where), params
+
+    def _rankings_rows(self, fecha, min_score=None, max_score=None, industry="", skills="",
+                       summary=False, sort="puntaje", descending=True, limit=None, offset=0):
+        """Itera el JSON guardado de cada fila del ranking, con los filtros, el orden y la página aplicados en SQL.
+
+        Con ``summary`` devuelve solo las columnas de ``SUMMARY_FIELDS`` más el ``id`` del
+        candidato, para pedir su detalle con ``get_candidate``.
+        """
+        where, params = self._rankings_where(fecha, min_score, max_score, industry, skills)
+        column = "json_set(c.summary, '$.id', c.id)" if summary else "c.data"
+        query = f"SELECT {column} FROM candidates c WHERE {where} ORDER BY {SORT_COLUMNS[sort]} {'DESC' if descending else 'ASC'}, c.id"
+        if limit is not None:
+            query += " LIMIT ? OFFSET ?"
+            params += [limit, offset]
+        return (row[0] for row in self._connect().execute(query, params))
+
+    def get_rankings(self, fecha, min_score=None, max_score=None, industry="", skills="", summary=False):
+        """Devuelve las filas del ranking de una ejecución ordenadas por puntaje, aplicando los filtros en SQL."""
+        return [json.loads(data) for data in self._rankings_rows(fecha, min_score, max_score, industry, skills, summary)]
+
+    def get_rankings_json(self, fecha, min_score=None, max_score=None, industry="", skills="", summary=False):
+        """Igual que ``get_rankings`` pero devuelve directamente el array JSON.
+
+        Las filas ya están guardadas como JSON, así que se concatenan sin decodificarlas
+        ni volver a serializarlas.
+        """
+        return "[" + ",".join(self._rankings_rows(fecha, min_score, max_score, industry, skills, summary)) + "]"
+
+    def _rankings_page(self, fecha, min_score, max_score, industry, skills, summary, sort, descending, page, per_page):
+        where, params = self._rankings_where(fecha, min_score, max_score, industry, skills)
+        total = self._connect().execute(f"SELECT COUNT(*) FROM candidates c WHERE {where}", params).fetchone()[0]
+        rows = self._rankings_rows(fecha, min_score, max_score, industry, skills, summary, sort, descending,
+                                   limit=per_page, offset=(page - 1) * per_page)
+        return total, rows
+
+    def get_rankings_page(self, fecha, min_score=None, max_score=None, industry="", skills="",
+                          summary=True, sort="puntaje", descending=True, page=1, per_page=50):
+        """Devuelve una página del ranking de una ejecución, ordenada por ``sort`` (una clave de ``SORT_COLUMNS``).
+
+        Por defecto solo con las columnas de resumen. Devuelve un diccionario con el total
+        de filas que cumplen los filtros y la página pedida, como ``search``.
+        """
+        total, rows = self._rankings_page(fecha, min_score, max_score, industry, skills, summary, sort, descending, page, per_page)
+        return {"total": total, "page": page, "per_page": per_page, "results": [json.loads(data) for data in rows]}
+
+    def get_rankings_page_json(self, fecha, min_score=None, max_score=None, industry="", skills="",
+                               summary=True, sort="puntaje", descending=True, page=1, per_page=50):
+        """Igual que ``get_rankings_page`` pero devuelve el JSON armado sin decodificar las filas."""
+        total, rows = self._rankings_page(fecha, min_score, max_score, industry, skills, summary, sort, descending, page, per_page)
+        return f'{{"total": {total}, "page": {page}, "per_page": {per_page}, "results": [' + ",".join(rows) + "]}"
+
+    def get_candidate(self, fecha, candidate_id):
+        """Devuelve la fila completa de un candidato de una ejecución (con su ``id``) o None si no existe."""
+        row = self._connect().execute(
+            "SELECT data FROM candidates WHERE id = ? AND fecha = ?", (candidate_id, fecha)
+        ).fetchone()
+        return None if row is None else dict(json.loads(row[0]), id=candidate_id)
+
+    def get_aggregates_json(self, fecha):
+        """Devuelve el resumen precalculado de una ejecución como JSON, o None si la ejecución no existe.
+
+        Las ejecuciones guardadas antes de precalcularlo se resumen la primera vez que se
+        piden y el resultado queda guardado.
+        """
+        conn = self._connect()
+        row = conn.execute("SELECT aggregates FROM runs WHERE fecha = ?", (fecha,)).fetchone()
+        if row is None or row[0] is not None:
+            return row and row[0]
+
+        aggregates = json.dumps(compute_aggregates(self.get_rankings(fecha)), ensure_ascii=False)
+        with conn:
+            conn.execute("UPDATE runs SET aggregates = ? WHERE fecha = ?", (aggregates, fecha))
+        return aggregates
+
+    def search(self, query="", min_score=None, max_score=None, days=None, page=1, per_page=20):
+        """Busca candidatos en todas las ejecuciones del usuario usando el índice invertido.
+
+        ``query`` admite la sintaxis de ``search_index.parse_query``. Los resultados se
+        ordenan por puntaje (y luego por fecha) y se paginan. Devuelve un diccionario con
+        el total de coincidencias y la página pedida.
+        """
+        where = []
+        params = []
+        for clause in parse_query(query or ""):
+            sql, clause_params = clause_sql(clause)
+            where.append(f"c.id IN ({sql})")
+            params.extend(clause_params)
+
+        if min_score is not None:
+            where.append("c.puntaje >= ?")
+            params.append(min_score)
+        if max_score is not None:
+            where.append("c.puntaje <= ?")
+            params.append(max_score)
+        if days:
+            # Las fechas de ejecución tienen el formato %Y%m%d%H%M, así que se comparan como texto
+            where.append("c.fecha >= ?")
+            params.append((datetime.now() - timedelta(days=days)).strftime("%Y%m%d%H%M"))
+
+        where_sql = f"WHERE {' AND '.join(where)}" if where else ""
+        conn = self._connect()
+        total = conn.execute(f"SELECT COUNT(*) FROM candidates c {where_sql}", params).fetchone()[0]
+        rows = conn.execute(
+            f"SELECT c.fecha, c.data FROM candidates c {where_sql} ORDER BY c.puntaje DESC, c.fecha DESC LIMIT ? OFFSET ?",
+            params + [per_page, (page - 1) * per_page]
+        ).fetchall()
+
+        return {
+            "query": query,
+            "total": total,
+            "page": page,
+            "per_page": per_page,
+            "results": [dict(json.loads(data), fecha=fecha) for fecha, data in rows],
+        }
+
+    def migrate_csv(self, rankings_folder):
+        """Importa los CSV ``cv_ranking_<fecha>.csv`` existentes (una sola vez por almacén).
+
+        Devuelve la cantidad de ejecuciones importadas.
+        """
+        conn = self._connect()
+        if conn.execute("SELECT value FROM meta WHERE key = 'csv_migrated'").fetchone():
+            return 0
+
+        imported = 0
+        for filename in sorted(os.listdir(rankings_folder)):
+            if not (filename.startswith("cv_ranking_") and filename.endswith(".csv")):
+                continue
+
+            fecha = filename[len("cv_ranking_"):-len(".csv")]
+            if self.has_run(fecha):
+                continue
+
+            path = os.path.join(rankings_folder, filename)
+            with open(path, newline="", encoding="utf-8") as file:
+                rows = list(csv.DictReader(file))
+            for row in rows:
+                score = parse_score(row.get("puntaje"))
+                if score is not None:
+                    row["puntaje"] = int(score) if score.is_integer() else score
+
+            rows.sort(key=lambda row: parse_score(row.get("puntaje")) or 0, reverse=True)
+            self.save_run(fecha, rows, report_filename=f"global_report_{fecha}.pdf", created=os.path.getmtime(path))
+            imported += 1
+
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('csv_migrated', ?)", (str(time.time()),))
+        return imported
+
+
+def get_ranking_store(user_folders):
+    """Devuelve el almacén de rankings del usuario (uno por proceso), migrando sus CSV la primera vez."""
+    db_path = os.path.join(user_folders.rankings, RANKINGS_DB)
+    with _stores_lock:
+        store = _stores.get(db_path)
+        if store is None:
+            store = RankingStore(db_path)
+            store.migrate_csv(user_folders.rankings)
+            _stores[db_path] = store
+    return store
+
+
+if __name__ == "__main__":
+    # Migración manual de todos los usuarios: python ranking_store.py
+    from utils import USERS_FOLDER, get_user_folders
+
+    for user in sorted(os.listdir(USERS_FOLDER)):
+        if not os.path.isdir(os.path.join(USERS_FOLDER, user)):
+            continue
+        user_folders = get_user_folders({"user": user})
+        store = RankingStore(os.path.join(user_folders.rankings, RANKINGS_DB))
+        print(f"{user}: {store.migrate_csv(user_folders.rankings)} rankings importados.")
@@ -0,0 +1,113 @@
+#Python 3.10
+# -*- coding: utf-8 -*-
+import threading
+from collections import OrderedDict
+
+from artifacts import analysis_signature, load_analysis, stored_candidates
+from local_scoring import rank_cvs, tokenize
+from ranking_store import get_ranking_store, parse_score
+from settings import get_settings
+from utils import candidate_pdf_filename, sanitize_filename
+
+_runs = OrderedDict()
+_runs_lock = threading.Lock()
+
+
+def _load_run(user_folders, fecha):
+    """Devuelve el análisis guardado de una ejecución, reutilizándolo mientras el archivo no cambie."""
+    key = analysis_signature(user_folders, fecha)
+    if key is None:
+        return None
+    with _runs_lock:
+        if key in _runs:
+            _runs.move_to_end(key)
+            return _runs[key]
+
+    stored = load_analysis(user_folders, fecha)
+    if stored is not None:
+        with _runs_lock:
+            _runs[key] = stored
+            while len(_runs) > get_settings().rerank_cache_runs:
+                _runs.popitem(last=False)
+    return stored
+
+
+def profile_text(candidato):
+    """Texto del perfil estructurado de un candidato, para medir su afinidad con un puesto."""
+    parts = [candidato.get("perfil_profesional") or "", candidato.get("industria_recomendada") or ""]
+    parts.extend(candidato.get("habilidades") or [])
+    parts.extend(candidato.get("recomendaciones_puestos") or [])
+    for exp in candidato.get("experiencia") or []:
+        parts.extend([exp.get("puesto") or "", exp.get("empresa") or ""])
+    for edu in candidato.get("educacion") or []:
+        parts.append(edu.get("titulo") or "")
+    return " ".join(str(part) for part in parts)
+
+
+def rerank(stored, job_position="", skills="", llm_weight=1.0, match_weight=None,
+           min_score=None, max_score=None, industry="", required_skills="", pdfs=None):
+    """Vuelve a ordenar los candidatos de un análisis guardado sin llamar a OpenAI.
+
+    El puntaje final combina el puntaje del modelo con la afinidad local (BM25 de 0 a
+    100 entre el perfil guardado y ``job_position``/``skills``):
+    ``(llm_weight * puntaje + match_weight * afinidad) / (llm_weight + match_weight)``.
+    ``match_weight`` se limita a [0, 1]; si no se indica vale 1 cuando hay puesto o
+    habilidades y 0 si no.
+    ``min_score``/``max_score`` se aplican al puntaje final, ``industry`` busca por
+    subcadena y ``required_skills`` (separadas por comas) exige todas esas habilidades.
+    ``pdfs`` ({nombre sanitizado: PDF}) conserva los enlaces del ranking guardado, por
+    ejemplo el PDF combinado; sin él cada candidato enlaza a su propio PDF.
+    Devuelve la lista de filas ordenada de mayor a menor puntaje final.
+    """
+    candidates = stored_candidates(stored)
+    pdfs = pdfs or {}
+    if match_weight is None:
+        match_weight = 1.0 if (job_position or skills) else 0.0
+    match_weight = min(max(match_weight, 0.0), 1.0)
+    total_weight = (llm_weight + match_weight) or 1.0
+
+    afinidad = [0] * len(candidates)
+    if match_weight and (job_position or skills):
+        for row in rank_cvs([(cv_name, profile_text(candidato)) for cv_name, candidato in candidates], job_position, skills):
+            afinidad[row["indice"]] = row["puntaje_local"]
+
+    required = [set(tokenize(skill)) for skill in (required_skills or "").split(",") if tokenize(skill)]
+    industry = (industry or "").lower()
+
+    rows = []
+    for i, (cv_name, candidato) in enumerate(candidates):
+        habilidades = candidato.get("habilidades") or []
+        if industry and industry not in (candidato.get("industria_recomendada") or "").lower():
+            continue
+        if required:
+            skill_terms = [set(tokenize(skill)) for skill in habilidades]
+            if not all(any(terms <= candidate_terms for candidate_terms in skill_terms) for terms in required):
+                continue
+
+        puntaje = parse_score(candidato.get("evaluacion", {}).get("puntaje"))
+        final = round((llm_weight * (puntaje or 0) + match_weight * afinidad[i]) / total_weight, 1)
+        if (min_score is not None and final < min_score) or (max_score is not None and final > max_score):
+            continue
+
+        rows.append({
+            "nombre": candidato.get("nombre", f"Candidato {i+1}"),
+            "puntaje": puntaje,
+            "afinidad": afinidad[i],
+            "puntaje_final": final,
+            "industria": candidato.get("industria_recomendada", "N/A"),
+            "Habilidades": ", ".join(habilidades or ["N/A"]),
+            "PDF": pdfs.get(cv_name) or candidate_pdf_filename(cv_name, stored["fecha"]),
+        })
+
+    rows.sort(key=lambda row: row["puntaje_final"], reverse=True)
+    return rows
+
+
+def rerank_run(user_folders, fecha, **criteria):
+    """Re-rankea una ejecución guardada (ver ``rerank``), con los PDFs de su ranking. Devuelve una tupla (filas, error)."""
+    stored = _load_run(user_folders, fecha)
+    if stored is None:
+        return None, "No se encontró el análisis de esa ejecución."
+    pdfs = {sanitize_filename(row["nombre"]): row["PDF"]
+            for row in get_ranking_store(user_folders).get_rankings(fecha, summary=True) if row.get("PDF")}
+    return rerank(stored, pdfs=pdfs, **criteria), None
@@ -0,0 +1,111 @@
+#Python 3.10
+# -*- coding: utf-8 -*-
+import re
+import shlex
+import unicodedata
+
+# Campo del índice -> columna de la fila del ranking de la que se extraen los términos
+INDEXED_FIELDS = {
+    "habilidad": "Habilidades",
+    "industria": "industria",
+    "mbti": "MBTI",
+    "puesto": "Recomendaciones de Puestos",
+}
+
+# Alias aceptados en las consultas (por ejemplo "skill:python")
+FIELD_ALIASES = {
+    "habilidad": "habilidad", "habilidades": "habilidad", "skill": "habilidad", "skills": "habilidad",
+    "industria": "industria", "industry": "industria",
+    "mbti": "mbti",
+    "puesto": "puesto", "puestos": "puesto", "position": "puesto",
+}
+
+
+def normalize_term(text):
+    """Pasa a minúsculas, quita acentos y colapsa espacios para que "Análisis  de Datos" == "analisis de datos"."""
+    text = unicodedata.normalize("NFKD", str(text)).encode("ascii", "ignore").decode("ascii")
+    return " ".join(re.sub(r"[^a-z0-9+#.\- ]", " ", text.lower()).split())
+
+
+def index_terms(row):
+    """Devuelve los pares (campo, término) a indexar de una fila del ranking.
+
+    Cada valor separado por comas se indexa completo ("machine learning") y también
+    palabra por palabra ("machine", "learning") para que ambas consultas encuentren al candidato.
+    """
+    terms = set()
+    for field, column in INDEXED_FIELDS.items():
+        value = row.get(column)
+        if not value or value == "N/A":
+            continue
+
+        for phrase in str(value).split(","):
+            phrase = normalize_term(phrase)
+            if not phrase or phrase == "n/a":
+                continue
+            terms.add((field, phrase))
+            for word in phrase.split():
+                terms.add((field, word))
+    return sorted(terms)
+
+
+def parse_query(query):
+    """Convierte una consulta en una lista de cláusulas unidas por AND.
+
+    Cada cláusula es una lista de alternativas (OR) de la forma (campo o None, término,
+    es_prefijo). Soporta ``AND``/``OR`` (AND implícito entre términos), frases entre
+    comillas, prefijos de campo (``skill:python``) y comodín final (``kube*``). Ejemplo:
+    ``Python AND "machine learning" OR R industria:finanzas`` ->
+    [[python], [machine learning, r], [industria=finanzas]].
+    """
+    try:
+        tokens = shlex.split(query)
+    except ValueError:
+        tokens = query.replace('"', " ").split()
+
+    clauses = []
+    join_next = False
+    for token in tokens:
+        if token.upper() == "AND":
+            join_next = False
+            continue
+        if token.upper() == "OR":
+            join_next = bool(clauses)
+            continue
+
+        field = None
+        if ":" in token:
+            prefix, value = token.split(":", 1)
+            if prefix.lower() in FIELD_ALIASES:
+                field, token = FIELD_ALIASES[prefix.lower()], value
+
+        prefix_match = token.endswith("*")
+        term = normalize_term(token.rstrip("*"))
+        if not term:
+            continue
+
+        if join_next:
+            clauses[-1].append((field, term, prefix_match))
+        else:
+            clauses.append([(field, term, prefix_match)])
+        join_next = False
+    return clauses
+
+
+def clause_sql(clause):
+    """Genera el SQL (subconsulta de ids de candidatos) y parámetros de una cláusula OR."""
+    conditions = []
+    params = []
+    for field, term, prefix_match in clause:
+        if prefix_match:
+            # Rango equivalente a LIKE 'term%' que sí aprovecha el índice
+            condition = "(term >= ? AND term < ?)"
+            params.extend([term, term + "\uffff"])
+        else:
+            condition = "term = ?"
+            params.append(term)
+        if field:
+            condition += " AND field = ?"
+            params.append(field)
+        conditions.append(f"({condition})")
+    return f"SELECT candidate_id FROM terms WHERE {' OR '.join(conditions)}", params
@@ -0,0 +1,109 @@
+#Python 3.10
+# -*- coding: utf-8 -*-
+import os
+
+API_KEY_FILE = "chatgpt-api-key.txt"
+DEFAULT_OPENAI_API_BASE = "https://api.openai.com/v1"
+
+# Parámetros de ajuste: atributo -> (variable de entorno, conversión, valor por defecto)
+TUNABLES = {
+    # Cola de trabajos y almacenamiento
+    "job_workers": ("JOB_WORKERS", int, 2),
+    "job_heartbeat_seconds": ("JOB_HEARTBEAT_SECONDS", float, 60),  # Cada cuánto se renueva la marca de vida de un trabajo
+    "job_stale_heartbeats": ("JOB_STALE_HEARTBEATS", int, 4),  # Renovaciones perdidas tras las que un trabajo se reencola
+    "run_retention_days": ("RUN_RETENTION_DAYS", int, 90),  # Ejecuciones más antiguas se archivan
+    "upload_retention_days": ("UPLOAD_RETENTION_DAYS", int, 30),  # PDFs subidos sin usar se borran
+    "storage_sweep_interval": ("STORAGE_SWEEP_INTERVAL", int, 6 * 3600),  # Segundos; 0 desactiva el hilo
+    # Límites de la API de OpenAI
+    "llm_requests_per_minute": ("LLM_REQUESTS_PER_MINUTE", int, 500),
+    "llm_tokens_per_minute": ("LLM_TOKENS_PER_MINUTE", int, 200000),
+    "llm_max_retries": ("LLM_MAX_RETRIES", int, 4),
+    "llm_timeout": ("LLM_TIMEOUT", float, 120),  # Plazo total por llamada, reintentos incluidos
+    "llm_pool_size": ("LLM_POOL_SIZE", int, 16),
+    # Análisis
+    "map_reduce_workers": ("MAP_REDUCE_WORKERS", int, 8),
+    "extraction_workers": ("EXTRACTION_WORKERS", int, os.cpu_count() or 1),
+    "pdf_extraction_backend": ("PDF_EXTRACTION_BACKEND", str, "pdfium"),  # Backend de cada página
+    "pdf_extraction_fallback": ("PDF_EXTRACTION_FALLBACK", str, "layout"),  # Reintento de páginas fallidas; "" lo desactiva
+    "max_tokens_per_cv": ("MAX_TOKENS_PER_CV", int, 2500),  # Presupuesto de un CV en su propio prompt
+    "max_tokens_comb_cv": ("MAX_TOKENS_COMB_CV", int, 12500),  # Presupuesto total del prompt de comparación
+    "prefilter_top_k": ("PREFILTER_TOP_K", int, 5),  # CVs que pasan a la comparación con OpenAI
+    "bulk_batch_size": ("BULK_BATCH_SIZE", int, 50),  # CVs extraídos y analizados entre dos checkpoints
+    "max_cvs_bulk": ("MAX_CVS_BULK", int, 5000),
+    "bulk_import_root": ("BULK_IMPORT_ROOT", str, "imports"),  # Carpetas del servidor importables desde la web
+    # Uploads
+    "max_upload_file_bytes": ("MAX_UPLOAD_FILE_BYTES", int, 20 * 1024 * 1024),
+    "max_upload_request_bytes": ("MAX_UPLOAD_REQUEST_BYTES", int, 512 * 1024 * 1024),
+    # Caches
+    "text_cache_max_bytes": ("TEXT_CACHE_MAX_BYTES", int, 256 * 1024 * 1024),
+    "response_cache_ttl": ("RESPONSE_CACHE_TTL", int, 7 * 24 * 3600),
+    "response_cache_max_bytes": ("RESPONSE_CACHE_MAX_BYTES", int, 64 * 1024 * 1024),
+    "artifact_cache_max_bytes": ("ARTIFACT_CACHE_MAX_BYTES", int, 64 * 1024 * 1024),
+    "rerank_cache_runs": ("RERANK_CACHE_RUNS", int, 32),  # Análisis descomprimidos que se mantienen en memoria
+    # Vistas y métricas
+    "ranking_page_size": ("RANKING_PAGE_SIZE", int, 50),  # Candidatos por página en la vista del ranking
+    "metrics_request_log": ("METRICS_REQUEST_LOG", lambda value: value == "1", False),  # Log JSON con los tiempos de cada request/trabajo
+}
+
+
+class Settings:
+    """Configuración de la app, resuelta desde variables de entorno al crear el objeto.
+
+    Crear la configuración no toca el disco: la API key de OpenAI se lee (de
+    ``OPENAI_API_KEY`` o de ``chatgpt-api-key.txt``) recién la primera vez que se usa,
+    así importar los módulos o arrancar un worker no falla si todavía no está.
+    Los argumentos con nombre reemplazan a las variables de entorno (útil en pruebas);
+    los parámetros de ajuste están en ``TUNABLES``.
+    """
+
+    def __init__(self, **overrides):
+        self.secret_key = os.environ.get("SECRET_KEY", "")
+        self.metrics_token = os.environ.get("METRICS_TOKEN", "")  # Si se define, /metrics exige "Authorization: Bearer <token>"
+        self.openai_api_base = os.environ.get("OPENAI_API_BASE", DEFAULT_OPENAI_API_BASE)
+        self.api_key_file = os.environ.get("OPENAI_API_KEY_FILE", API_KEY_FILE)
+        self._openai_api_key = os.environ.get("OPENAI_API_KEY") or None
+        for name, (variable, convert, default) in TUNABLES.items():
+            value = os.environ.get(variable)
+            setattr(self, name, default if value is None else convert(value))
+        for name, value in overrides.items():
+            setattr(self, "_openai_api_key" if name == "openai_api_key" else name, value)
+
+    @property
+    def openai_api_key(self):
+        """API key de OpenAI, o None si no está configurada."""
+        if self._openai_api_key is None and os.path.exists(self.api_key_file):
+            with open(self.api_key_file, "r") as file:
+                self._openai_api_key = file.read().strip() or None
+        return self._openai_api_key
+
+
+_settings = None
+_reset_hooks = []
+
+
+def get_settings():
+    """Devuelve la configuración del proceso, creándola desde el entorno en el primer uso."""
+    global _settings
+    if _settings is None:
+        _settings = Settings()
+    return _settings
+
+
+def on_configure(hook):
+    """Registra una función que ``configure`` llama para descartar lo creado con la configuración anterior.
+
+    Los módulos la usan (como decorador) para sus recursos compartidos: el cliente de
+    OpenAI, las caches, los pools y la cola de trabajos se vuelven a crear en el
+    siguiente uso con los valores nuevos.
+    """
+    _reset_hooks.append(hook)
+    return hook
+
+
+def configure(settings):
+    """Reemplaza la configuración del proceso (la usa ``create_app``) y descarta los recursos creados con la anterior."""
+    global _settings
+    _settings = settings
+    for hook in _reset_hooks:
+        hook()
+    return settings
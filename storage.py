@@ -0,0 +1,299 @@
+#Python 3.10
+# -*- coding: utf-8 -*-
+import os
+import re
+import time
+import secrets
+import zipfile
+import argparse
+import threading
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from settings import get_settings
+
+try:
+    import fcntl
+except ImportError:  # Windows: solo se sincronizan los hilos del proceso
+    fcntl = None
+
+UPLOAD_FOLDER = "uploads"
+RESULTS_FOLDER = "results"
+PROCESSED_FOLDER = "processed"
+REPORTS_FOLDER = "reports"
+RANKING_FOLDER = "ranking"
+ARCHIVE_FOLDER = "archive"  # Un ZIP por mes con los archivos de las ejecuciones antiguas
+USERS_FOLDER = "users"
+USERS_FILE = "users.json"
+
+DISK_USAGE_TTL = 60  # Segundos que se reutiliza el cálculo de espacio de un usuario
+
+# Id de ejecución: fecha a minuto (como antes) más un sufijo aleatorio para que dos
+# análisis del mismo minuto no se pisen. Los ids antiguos sin sufijo siguen siendo válidos.
+RUN_ID_PATTERN = r"\d{12}(?:-[0-9a-f]{6})?"
+RUN_ID_RE = re.compile(rf"^{RUN_ID_PATTERN}$")
+RUN_FILE_RE = re.compile(rf"^(?:.*_)?(?P<fecha>{RUN_ID_PATTERN})\.(?:pdf|csv|json|json\.gz|lock)$")
+
+_user_folders = {}
+_user_folders_lock = threading.Lock()
+_disk_usage = {}
+_maintenance_thread = None
+
+
+def new_run_id(now=None):
+    """Devuelve un id de ejecución nuevo: 202501011200-a1b2c3 (ordenable por fecha)."""
+    return f"{(now or datetime.now()).strftime('%Y%m%d%H%M')}-{secrets.token_hex(3)}"
+
+
+def is_run_id(value):
+    return bool(value) and RUN_ID_RE.match(value) is not None
+
+
+def run_datetime(fecha):
+    """Fecha y hora de una ejecución a partir de su id."""
+    return datetime.strptime(fecha[:12], "%Y%m%d%H%M")
+
+
+def run_title(fecha):
+    """Fecha de una ejecución para mostrar en títulos y PDFs: 01/01/2025 12:00."""
+    return run_datetime(fecha).strftime("%d/%m/%Y %H:%M")
+
+
+def user_root(user):
+    return os.path.join(USERS_FOLDER, user)
+
+
+def get_user_folders(session):
+    """Obtiene las rutas de las carpetas del usuario actual y las crea si no existen.
+
+    Las carpetas se crean una vez por proceso y usuario; los requests siguientes
+    reutilizan las rutas sin tocar el disco.
+    """
+    if "user" not in session:
+        return None  # No hay sesión activa
+
+    user = session["user"]
+    with _user_folders_lock:
+        user_folders = _user_folders.get(user)
+    if user_folders is not None:
+        return user_folders
+
+    user_folders = SimpleNamespace(
+        upload=os.path.join(USERS_FOLDER, user, UPLOAD_FOLDER),
+        results=os.path.join(USERS_FOLDER, user, RESULTS_FOLDER),
+        reports=os.path.join(USERS_FOLDER, user, REPORTS_FOLDER),
+        rankings=os.path.join(USERS_FOLDER, user, RANKING_FOLDER),
+    )
+    for folder in vars(user_folders).values():
+        os.makedirs(folder, exist_ok=True)
+
+    with _user_folders_lock:
+        return _user_folders.setdefault(user, user_folders)
+
+
+def archive_path(user_folders, month):
+    """Ruta del archivo de un mes (``month`` es AAAAMM)."""
+    return os.path.join(os.path.dirname(user_folders.results), ARCHIVE_FOLDER, f"runs_{month}.zip")
+
+
+def archived_member(user_folders, fecha, filename):
+    """Devuelve (ZipInfo, ruta del ZIP) de un archivo de una ejecución archivada, o (None, None).
+
+    ``filename`` es relativo a la carpeta del usuario, por ejemplo ``results/analysis_<id>.json.gz``.
+    """
+    bundle = archive_path(user_folders, fecha[:6])
+    if not os.path.exists(bundle):
+        return None, None
+    with zipfile.ZipFile(bundle) as archive:
+        try:
+            return archive.getinfo(f"{fecha}/{filename}"), bundle
+        except KeyError:
+            return None, None
+
+
+def read_archived(user_folders, fecha, filename):
+    """Devuelve el contenido de un archivo de una ejecución archivada, o None si no está."""
+    info, bundle = archived_member(user_folders, fecha, filename)
+    if info is None:
+        return None
+    with zipfile.ZipFile(bundle) as archive:
+        return archive.read(info)
+
+
+def _run_files(user_folders):
+    """Agrupa los archivos sueltos de cada ejecución (análisis, PDFs, reportes y CSV antiguos) por id."""
+    runs = {}
+    for folder in (user_folders.results, user_folders.reports, user_folders.rankings):
+        for entry in os.scandir(folder):
+            match = RUN_FILE_RE.match(entry.name)
+            if entry.is_file() and match:
+                runs.setdefault(match.group("fecha"), []).append(entry.path)
+    return runs
+
+
+def _add_to_bundle(bundle, members):
+    """Agrega archivos a un ZIP; los que ya estaban (una ejecución archivada y modificada después) se reemplazan."""
+    os.makedirs(os.path.dirname(bundle), exist_ok=True)
+    if os.path.exists(bundle):
+        with zipfile.ZipFile(bundle) as archive:
+            existing = set(archive.namelist())
+        if existing & set(members):
+            tmp_path = bundle + ".tmp"
+            with zipfile.ZipFile(bundle) as source, zipfile.ZipFile(tmp_path, "w") as target:
+                for info in source.infolist():
+                    if info.filename not in members:
+                        target.writestr(info, source.read(info))
+            os.replace(tmp_path, bundle)
+
+    with zipfile.ZipFile(bundle, "a") as archive:
+        for name, path in members.items():
+            # El análisis ya está comprimido con gzip; el resto (PDFs, CSV, JSON) se comprime en el ZIP
+            compression = zipfile.ZIP_STORED if path.endswith(".gz") else zipfile.ZIP_DEFLATED
+            archive.write(path, name, compress_type=compression)
+
+
+def archive_runs(user_folders, older_than_days=None, now=None):
+    """Mueve los archivos de las ejecuciones más antiguas a un ZIP por mes (``archive/runs_AAAAMM.zip``).
+
+    Sin ``older_than_days`` se usa ``run_retention_days`` de la configuración. El
+    ranking de la ejecución sigue en el almacén de rankings; su análisis, PDFs y
+    reporte se leen desde el ZIP cuando se piden. El archivo de lock de la ejecución
+    no se borra: otro proceso puede estar esperándolo con el archivo abierto y
+    bloquearía uno distinto del que crea el siguiente. Devuelve la cantidad de
+    ejecuciones archivadas.
+    """
+    from artifacts import run_lock  # artifacts depende de este módulo
+
+    if older_than_days is None:
+        older_than_days = get_settings().run_retention_days
+    cutoff = (now or datetime.now()) - timedelta(days=older_than_days)
+    archived = 0
+    for fecha, paths in sorted(_run_files(user_folders).items()):
+        if run_datetime(fecha) >= cutoff or all(path.endswith(".lock") for path in paths):
+            continue
+        with run_lock(user_folders, fecha):
+            paths = [path for path in paths if os.path.exists(path) and not path.endswith(".lock")]
+            if paths:
+                # Dentro del ZIP: <id>/<carpeta>/<archivo>, por ejemplo 202501011200-a1b2c3/results/analysis_....json.gz
+                members = {f"{fecha}/{os.path.basename(os.path.dirname(path))}/{os.path.basename(path)}": path for path in paths}
+                _add_to_bundle(archive_path(user_folders, fecha[:6]), members)
+                for path in paths:
+                    os.remove(path)
+                archived += 1
+    return archived
+
+
+def prune_uploads(user_folders, older_than_days=None, now=None):
+    """Borra los PDFs subidos (y ZIP de importación) que no se usan desde hace ``older_than_days`` días.
+
+    Sin ``older_than_days`` se usa ``upload_retention_days`` de la configuración.
+
+    El texto de cada PDF queda en la cache de extracción y su análisis en la ejecución,
+    así que el archivo original solo hace falta mientras el trabajo está pendiente.
+    Devuelve la cantidad de bytes liberados.
+    """
+    if older_than_days is None:
+        older_than_days = get_settings().upload_retention_days
+    cutoff = (now or time.time()) - older_than_days * 86400
+    freed = 0
+    for root, dirs, names in os.walk(user_folders.upload):
+        for name in names:
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+                if stat.st_mtime < cutoff:
+                    os.remove(path)
+                    freed += stat.st_size
+            except FileNotFoundError:
+                continue
+    return freed
+
+
+def disk_usage(user, max_age=DISK_USAGE_TTL):
+    """Devuelve los bytes que ocupa un usuario por carpeta (uploads, results, ..., archive) y el total."""
+    cached = _disk_usage.get(user)
+    if cached and time.time() - cached[0] < max_age:
+        return dict(cached[1])
+
+    usage = {}
+    root = user_root(user)
+    for folder in (UPLOAD_FOLDER, RESULTS_FOLDER, REPORTS_FOLDER, RANKING_FOLDER, ARCHIVE_FOLDER):
+        total = 0
+        for dirpath, dirs, names in os.walk(os.path.join(root, folder)):
+            for name in names:
+                try:
+                    total += os.path.getsize(os.path.join(dirpath, name))
+                except FileNotFoundError:
+                    continue
+        usage[folder] = total
+    usage["total"] = sum(usage.values())
+    _disk_usage[user] = (time.time(), usage)
+    return dict(usage)
+
+
+def run_maintenance(run_days=None, upload_days=None):
+    """Archiva ejecuciones y limpia uploads de todos los usuarios.
+
+    Un lock de archivo evita que varios procesos (workers de gunicorn) lo hagan a la
+    vez; si otro proceso ya lo está haciendo devuelve None. Si no, devuelve
+    {usuario: (ejecuciones archivadas, bytes liberados)}.
+    """
+    if not os.path.isdir(USERS_FOLDER):
+        return {}
+    with open(os.path.join(USERS_FOLDER, ".maintenance.lock"), "a") as lock_file:
+        if fcntl:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return None
+        try:
+            summary = {}
+            for user in sorted(os.listdir(USERS_FOLDER)):
+                if not os.path.isdir(user_root(user)):
+                    continue
+                user_folders = get_user_folders({"user": user})
+                summary[user] = (archive_runs(user_folders, run_days), prune_uploads(user_folders, upload_days))
+                _disk_usage.pop(user, None)
+            return summary
+        finally:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def start_maintenance(interval=None):
+    """Arranca (una vez por proceso) el hilo que ejecuta ``run_maintenance`` cada ``interval`` segundos.
+
+    Sin ``interval`` se usa ``storage_sweep_interval`` de la configuración.
+    """
+    global _maintenance_thread
+    if interval is None:
+        interval = get_settings().storage_sweep_interval
+    if interval <= 0 or _maintenance_thread is not None:
+        return
+
+    def loop():
+        while True:
+            time.sleep(interval)
+            try:
+                run_maintenance()
+            except Exception as e:
+                print(f"Error en el mantenimiento del almacenamiento: {e}")
+
+    _maintenance_thread = threading.Thread(target=loop, name="storage-maintenance", daemon=True)
+    _maintenance_thread.start()
+
+
+if __name__ == "__main__":
+    # Mantenimiento manual (por ejemplo desde cron): python storage.py --run-days 90 --upload-days 30
+    parser = argparse.ArgumentParser(description="Archiva ejecuciones antiguas y limpia los PDFs subidos.")
+    parser.add_argument("--run-days", type=int, default=None, help="Por defecto RUN_RETENTION_DAYS (90)")
+    parser.add_argument("--upload-days", type=int, default=None, help="Por defecto UPLOAD_RETENTION_DAYS (30)")
+    args = parser.parse_args()
+
+    summary = run_maintenance(args.run_days, args.upload_days)
+    if summary is None:
+        print("Otro proceso está ejecutando el mantenimiento.")
+    for user, (archived, freed) in (summary or {}).items():
+        usage = disk_usage(user, max_age=0)
+        print(f"{user}: {archived} ejecuciones archivadas, {freed / 1024 / 1024:.1f} MB liberados, "
+              f"{usage['total'] / 1024 / 1024:.1f} MB en uso.")
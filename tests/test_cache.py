@@ -0,0 +1,63 @@
+#Python 3.10
+# -*- coding: utf-8 -*-
+import pytest
+
+import cache
+from cache import DiskCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache.time, "time", clock)
+    return clock
+
+
+def test_lru_eviction(tmp_path, clock):
+    disk = DiskCache(str(tmp_path / "cache.sqlite3"), max_bytes=30)
+    for key in "abc":
+        clock.now += 1
+        disk.set(key, key * 10)
+
+    clock.now += 1
+    assert disk.get("a") == b"a" * 10  # "a" pasa a ser la más usada recientemente
+    clock.now += 1
+    disk.set("d", "d" * 10)
+
+    assert disk.get("b") is None
+    assert [disk.get(key) for key in "acd"] == [b"a" * 10, b"c" * 10, b"d" * 10]
+    assert disk.stats()["bytes"] == 30
+
+
+def test_values_larger_than_the_cache_are_not_stored(tmp_path, clock):
+    disk = DiskCache(str(tmp_path / "cache.sqlite3"), max_bytes=10)
+    disk.set("small", "x" * 5)
+    disk.set("big", "x" * 11)
+    assert disk.get("big") is None
+    assert disk.get("small") == b"x" * 5
+
+
+def test_ttl_expiry(tmp_path, clock):
+    disk = DiskCache(str(tmp_path / "cache.sqlite3"), ttl=60)
+    disk.set("a", "valor")
+    clock.now += 30
+    assert disk.get("a") == b"valor"  # Leer no renueva el TTL
+    clock.now += 31
+    assert disk.get("a") is None
+    assert disk.stats()["entries"] == 0
+
+
+def test_expired_entries_are_purged_on_write(tmp_path, clock):
+    disk = DiskCache(str(tmp_path / "cache.sqlite3"), ttl=60)
+    disk.set("old", "x")
+    clock.now += 61
+    disk.set("new", "y")
+    assert disk.stats()["entries"] == 1
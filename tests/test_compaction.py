@@ -0,0 +1,51 @@
+#Python 3.10
+# -*- coding: utf-8 -*-
+from compaction import PAGE_SEPARATOR, TRUNCATION_MARK, compact_cv_text, count_tokens, remove_repeated_blocks, truncate_sections
+
+HEADER = "Ana Pérez - ana.perez@example.com - +34 600 000 000"
+
+
+def page(number, body):
+    return "\n".join([HEADER, *body, f"Página {number} de 3"])
+
+
+def long_cv():
+    experiencia = [f"Desarrolladora en la empresa {i}: diseño de APIs, bases de datos y despliegues en la nube." for i in range(80)]
+    return "\n".join(["Perfil", "Ingeniera de software backend.", "Experiencia", *experiencia,
+                      "Educación", "Ingeniería Informática, Universidad de Madrid", "Idiomas", "Inglés C1"])
+
+
+def test_repeated_headers_and_footers_are_dropped():
+    text = PAGE_SEPARATOR.join([page(1, ["Perfil", "Backend"]), page(2, ["Experiencia", "Dev"]), page(3, ["Idiomas", "Inglés"])])
+    result = remove_repeated_blocks(text)
+    assert result.count(HEADER) == 1
+    assert result.count("Página") == 1
+    for line in ("Perfil", "Backend", "Experiencia", "Dev", "Idiomas", "Inglés"):
+        assert line in result.splitlines()
+
+
+def test_single_page_keeps_short_repeated_lines():
+    assert remove_repeated_blocks("Python\nSQL\nPython") == "Python\nSQL\nPython"
+
+
+def test_truncate_sections_respects_the_budget_and_keeps_titles():
+    text = long_cv()
+    for budget in (150, 400, 1000):
+        result = truncate_sections(text, budget)
+        assert count_tokens(result) <= budget
+        for title in ("Perfil", "Experiencia", "Educación", "Idiomas"):
+            assert title in result.splitlines()
+    assert "Inglés C1" in truncate_sections(text, 400)  # Las secciones cortas entran enteras
+    assert TRUNCATION_MARK in truncate_sections(text, 400)
+
+
+def test_compact_cv_text_respects_the_budget():
+    text = PAGE_SEPARATOR.join(page(i, long_cv().splitlines()[:30]) for i in (1, 2, 3))
+    result = compact_cv_text(text, max_tokens=300)
+    assert count_tokens(result) <= 300
+    assert result.count(HEADER) <= 1
+
+
+def test_compact_cv_text_leaves_short_cvs_untouched():
+    text = "Perfil\nIngeniera   de software\n\n\n\nExperiencia\nDev"
+    assert compact_cv_text(text, max_tokens=1000) == "Perfil\nIngeniera de software\n\nExperiencia\nDev"
@@ -0,0 +1,105 @@
+#Python 3.10
+# -*- coding: utf-8 -*-
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from jobs import JobQueue
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def insert_running(db_path, job_id, heartbeat):
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("INSERT INTO jobs (id, user, status, payload, created, started, heartbeat) "
+                     "VALUES (?, 'ana', 'running', '{\"n\": 0}', 0, ?, ?)", (job_id, heartbeat, heartbeat))
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "jobs" / "jobs.sqlite3")
+
+
+def test_submit_runs_the_job_and_stores_the_result(db_path):
+    queue = JobQueue(db_path, lambda payload: ({"doble": payload["n"] * 2}, None), workers=1)
+    job_id = queue.submit("ana", {"n": 21})
+    assert wait_for(lambda: queue.get(job_id)["status"] == "done")
+    job = queue.get(job_id)
+    assert job["result"] == {"doble": 42} and job["error"] is None and job["payload"] == {"n": 21}
+
+
+def test_handler_errors_are_stored(db_path):
+    def handler(payload):
+        raise RuntimeError("fallo")
+
+    queue = JobQueue(db_path, handler, workers=1)
+    job_id = queue.submit("ana", {})
+    assert wait_for(lambda: queue.get(job_id)["status"] == "error")
+    assert "fallo" in queue.get(job_id)["error"]
+
+
+def test_each_job_is_claimed_once(db_path):
+    first = JobQueue(db_path, None)
+    second = JobQueue(db_path, None)
+    for n in range(20):
+        with first._connect() as conn:
+            conn.execute("INSERT INTO jobs (id, user, status, payload, created) VALUES (?, 'ana', 'queued', '{}', ?)", (str(n), n))
+
+    claimed = []
+    lock = threading.Lock()
+
+    def claim(queue):
+        while True:
+            row = queue._claim()
+            if row is None:
+                return
+            with lock:
+                claimed.append(row[0])
+
+    threads = [threading.Thread(target=claim, args=(queue,)) for queue in (first, second, first, second)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(claimed, key=int) == [str(n) for n in range(20)]
+
+
+def test_stale_jobs_are_requeued_and_live_ones_are_not(db_path):
+    queue = JobQueue(db_path, None, heartbeat_seconds=10)
+    insert_running(db_path, "dead", time.time() - 3600)
+    insert_running(db_path, "alive", time.time())
+    assert queue.recover_stale() == 1
+    assert queue.get("dead")["status"] == "queued"
+    assert queue.get("alive")["status"] == "running"
+
+
+def test_workers_sweep_stale_jobs_while_running(db_path):
+    done = []
+    queue = JobQueue(db_path, lambda payload: (done.append(payload) or {}, None), workers=1, heartbeat_seconds=0.1)
+    queue.start()
+    insert_running(db_path, "dead", time.time())  # Su proceso muere después de arrancar la cola
+    assert wait_for(lambda: queue.get("dead")["status"] == "done")
+    assert done == [{"n": 0}]
+    queue.stop()
+
+
+def test_heartbeat_keeps_long_jobs_alive(db_path):
+    release = threading.Event()
+    queue = JobQueue(db_path, lambda payload: (release.wait(5) and {}, None), workers=1, heartbeat_seconds=0.1)
+    job_id = queue.submit("ana", {})
+    assert wait_for(lambda: queue.get(job_id)["status"] == "running")
+    time.sleep(0.8)  # Más que el umbral de huérfano (4 renovaciones)
+    other = JobQueue(db_path, None, heartbeat_seconds=0.1)
+    assert other.recover_stale() == 0
+    release.set()
+    assert wait_for(lambda: queue.get(job_id)["status"] == "done")
+    queue.stop()
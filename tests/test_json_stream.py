@@ -0,0 +1,55 @@
+#Python 3.10
+# -*- coding: utf-8 -*-
+import json
+
+from json_stream import IncrementalArrayParser
+
+
+def feed_all(parser, chunks):
+    objects = []
+    for chunk in chunks:
+        objects.extend(parser.feed(chunk))
+    return objects
+
+
+def chunked(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def test_objects_split_across_chunks():
+    candidates = [{"nombre": f"Candidato {i}", "evaluacion": {"puntaje": 50 + i}} for i in range(5)]
+    text = "```json\n" + json.dumps({"candidatos": candidates, "mejor_para_puesto": {}}) + "\n```"
+    for size in (1, 3, 7, len(text)):
+        parser = IncrementalArrayParser("candidatos")
+        assert feed_all(parser, chunked(text, size)) == candidates
+        assert parser.done
+
+
+def test_objects_are_returned_as_soon_as_they_close():
+    parser = IncrementalArrayParser("candidatos")
+    assert parser.feed('{"candidatos": [{"nombre": "Ana"}, {"nom') == [{"nombre": "Ana"}]
+    assert parser.feed('bre": "Beto"}]}') == [{"nombre": "Beto"}]
+
+
+def test_escaped_quotes_and_braces_inside_strings():
+    candidates = [
+        {"nombre": 'Ana "la jefa"', "perfil": "usa {llaves} y [corchetes]"},
+        {"nombre": "Beto\\", "perfil": "} ] \" {"},
+    ]
+    text = json.dumps({"candidatos": candidates})
+    parser = IncrementalArrayParser("candidatos")
+    assert feed_all(parser, chunked(text, 2)) == candidates
+
+
+def test_nested_arrays_and_other_keys():
+    candidates = [
+        {"nombre": "Ana", "experiencia": [{"puesto": "Dev", "tags": [["a"], ["b"]]}], "habilidades": ["Python"]},
+        {"nombre": "Beto", "experiencia": [], "habilidades": []},
+    ]
+    text = json.dumps({
+        "otros": [{"nombre": "no es un candidato"}],
+        "comparacion_global": {"candidatos": [{"nombre": "anidado, no es el array buscado"}]},
+        "candidatos": candidates,
+    })
+    parser = IncrementalArrayParser("candidatos")
+    assert feed_all(parser, chunked(text, 5)) == candidates
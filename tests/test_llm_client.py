@@ -0,0 +1,111 @@
+#Python 3.10
+# -*- coding: utf-8 -*-
+import json
+
+import pytest
+
+from llm_client import LLMClient, LLMError, TokenBucket, estimate_tokens
+
+CAPACITY = 100000
+MESSAGES = [{"role": "user", "content": "x" * 400}]
+
+
+class FakeResponse:
+    def __init__(self, data=None, lines=()):
+        self.data = data
+        self.lines = lines
+
+    def json(self):
+        return self.data
+
+    def iter_lines(self):
+        return iter(self.lines)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+@pytest.fixture
+def client():
+    client = LLMClient("key", requests_per_minute=1000, tokens_per_minute=CAPACITY, max_retries=3)
+    client._backoff = lambda attempt, error, deadline: True
+    return client
+
+
+def failing_then(client, response, failures):
+    """Hace que las primeras ``failures`` peticiones respondan 500 y luego ``response``."""
+    calls = []
+
+    def post(path, payload, deadline, stream=False):
+        calls.append(payload)
+        if len(calls) <= failures:
+            raise LLMError("HTTP 500", status=500, retryable=True)
+        return response
+
+    client._post = post
+    return calls
+
+
+def spent(client):
+    return round(CAPACITY - client.token_limiter.tokens)
+
+
+def test_token_bucket_adjust_refunds_and_charges():
+    bucket = TokenBucket(600)
+    assert bucket.acquire(100)
+    bucket.adjust(-60)
+    assert round(bucket.tokens) == 560
+    bucket.adjust(1000)
+    assert bucket.tokens < 0
+    bucket.adjust(-10 ** 6)
+    assert bucket.tokens == bucket.capacity
+
+
+def test_retries_reserve_tokens_once_and_settle_with_usage(client):
+    calls = failing_then(client, FakeResponse({"usage": {"total_tokens": 50}, "choices": []}), failures=2)
+    client.chat("model", MESSAGES)
+    assert len(calls) == 3
+    assert spent(client) == 50
+
+
+def test_failed_call_refunds_its_reservation(client):
+    calls = failing_then(client, None, failures=10)
+    with pytest.raises(LLMError):
+        client.chat("model", MESSAGES)
+    assert len(calls) == client.max_retries + 1
+    assert spent(client) == 0
+
+
+def test_response_without_usage_keeps_the_estimate(client):
+    failing_then(client, FakeResponse({"choices": []}), failures=0)
+    client.chat("model", MESSAGES, max_tokens=200)
+    assert spent(client) == estimate_tokens(MESSAGES) + 200
+
+
+def sse(*chunks):
+    return [f"data: {json.dumps(chunk)}".encode() for chunk in chunks] + [b"data: [DONE]"]
+
+
+def test_stream_settles_with_reported_usage(client):
+    lines = sse({"choices": [{"delta": {"content": "hola"}}]}, {"choices": [], "usage": {"total_tokens": 42}})
+    failing_then(client, FakeResponse(lines=lines), failures=1)
+    assert "".join(client.stream_chat("model", MESSAGES)) == "hola"
+    assert spent(client) == 42
+
+
+def test_stream_without_usage_settles_with_text_length(client):
+    failing_then(client, FakeResponse(lines=sse({"choices": [{"delta": {"content": "a" * 400}}]})), failures=0)
+    assert len("".join(client.stream_chat("model", MESSAGES))) == 400
+    assert spent(client) == estimate_tokens(MESSAGES) + 100
+
+
+def test_stream_closed_early_settles_what_was_received(client):
+    lines = sse({"choices": [{"delta": {"content": "a" * 40}}]}, {"choices": [{"delta": {"content": "b" * 40}}]})
+    failing_then(client, FakeResponse(lines=lines), failures=0)
+    stream = client.stream_chat("model", MESSAGES)
+    next(stream)
+    stream.close()
+    assert spent(client) == estimate_tokens(MESSAGES) + 10
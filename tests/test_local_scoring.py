@@ -0,0 +1,30 @@
+#Python 3.10
+# -*- coding: utf-8 -*-
+from local_scoring import prefilter_cvs, rank_cvs
+
+CVS = [
+    ("cocina.pdf", "Chef con experiencia en cocina mediterránea y gestión de restaurantes."),
+    ("python.pdf", "Desarrollador backend Python con Django, PostgreSQL y Kubernetes. Python en producción."),
+    ("mixto.pdf", "Analista de datos con Python y Excel."),
+    ("vacio.pdf", ""),
+]
+
+
+def test_rank_cvs_orders_by_relevance():
+    ranking = rank_cvs(CVS, "Desarrollador Python", "Kubernetes, Django")
+    assert [row["archivo"] for row in ranking][:2] == ["python.pdf", "mixto.pdf"]
+    assert ranking[0]["puntaje_local"] == 100
+    assert [row["puntaje_local"] for row in ranking] == sorted((row["puntaje_local"] for row in ranking), reverse=True)
+    assert {row["indice"] for row in ranking} == set(range(len(CVS)))
+
+
+def test_rank_cvs_keeps_upload_order_on_ties():
+    ranking = rank_cvs(CVS, "", "")
+    assert [row["indice"] for row in ranking] == [0, 1, 2, 3]
+    assert all(row["puntaje_local"] == 0 for row in ranking)
+
+
+def test_prefilter_keeps_the_top_k_in_upload_order():
+    selected, ranking = prefilter_cvs(CVS, "Python", "Django", top_k=2)
+    assert [name for name, _ in selected] == ["python.pdf", "mixto.pdf"]
+    assert sum(row["seleccionado"] for row in ranking) == 2
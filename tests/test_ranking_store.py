@@ -0,0 +1,91 @@
+#Python 3.10
+# -*- coding: utf-8 -*-
+import csv
+
+import pytest
+
+from ranking_store import RankingStore, SORT_COLUMNS
+
+FECHA = "202601011200-aaaaaa"
+
+
+def row(nombre, puntaje, industria="Tecnología", habilidades="Python"):
+    return {"nombre": nombre, "puntaje": puntaje, "industria": industria, "MBTI": "INTJ",
+            "Habilidades": habilidades, "PDF": f"{nombre}_analysis_{FECHA}.pdf"}
+
+
+@pytest.fixture
+def store(tmp_path):
+    return RankingStore(str(tmp_path / "rankings" / "rankings.sqlite3"))
+
+
+def names(rows):
+    return [r["nombre"] for r in rows]
+
+
+def test_industry_filter_is_a_literal_substring(store):
+    store.save_run(FECHA, [row("A", 90, "Tecnología"), row("B", 80, "100% remoto"), row("C", 70, "I_T"),
+                           row("D", 60, "back\\end"), row("E", 50, "IXT")])
+    assert names(store.get_rankings(FECHA, industry="%")) == ["B"]
+    assert names(store.get_rankings(FECHA, industry="_")) == ["C"]
+    assert names(store.get_rankings(FECHA, industry="I_T")) == ["C"]
+    assert names(store.get_rankings(FECHA, industry="back\\end")) == ["D"]
+    assert names(store.get_rankings(FECHA, industry="tecno")) == ["A"]
+
+
+def test_pagination_and_sort(store):
+    store.save_run(FECHA, [row(nombre, puntaje) for nombre, puntaje in [("carla", 70), ("Ana", 90), ("beto", 80)]])
+    page = store.get_rankings_page(FECHA, page=1, per_page=2)
+    assert page["total"] == 3 and names(page["results"]) == ["Ana", "beto"]
+    assert names(store.get_rankings_page(FECHA, page=2, per_page=2)["results"]) == ["carla"]
+    assert names(store.get_rankings_page(FECHA, sort="nombre", descending=False)["results"]) == ["Ana", "beto", "carla"]
+    assert set(page["results"][0]) == {"nombre", "puntaje", "industria", "MBTI", "Habilidades", "PDF", "id"}
+
+
+def test_sort_is_limited_to_the_whitelist(store):
+    store.save_run(FECHA, [row("Ana", 90)])
+    assert set(SORT_COLUMNS) == {"puntaje", "nombre", "industria"}
+    with pytest.raises(KeyError):
+        store.get_rankings_page(FECHA, sort="puntaje; DROP TABLE runs")
+
+
+def test_search_with_min_score(store):
+    store.save_run(FECHA, [row("A", 90, habilidades="Python, Kubernetes"), row("B", 60, habilidades="Python, Kubernetes"),
+                           row("C", 95, habilidades="Python")])
+    result = store.search("Python AND Kubernetes", min_score=70)
+    assert result["total"] == 1 and names(result["results"]) == ["A"]
+    assert names(store.search("python")["results"]) == ["C", "A", "B"]
+
+
+def test_migrate_csv_is_idempotent(tmp_path):
+    folder = tmp_path / "ranking"
+    folder.mkdir()
+    with open(folder / f"cv_ranking_{FECHA}.csv", "w", newline="", encoding="utf-8") as file:
+        writer = csv.DictWriter(file, fieldnames=["nombre", "puntaje", "industria", "MBTI", "Habilidades", "PDF"])
+        writer.writeheader()
+        writer.writerows([row("Ana", 70), row("Beto", 85)])
+
+    store = RankingStore(str(folder / "rankings.sqlite3"))
+    assert store.migrate_csv(str(folder)) == 1
+    assert store.migrate_csv(str(folder)) == 0
+    assert RankingStore(str(folder / "rankings.sqlite3")).migrate_csv(str(folder)) == 0
+    assert names(store.get_rankings(FECHA)) == ["Beto", "Ana"]
+    assert store.get_rankings(FECHA)[0]["puntaje"] == 85
+    assert len(store.list_runs()) == 1
+
+
+def test_terms_are_deleted_with_their_candidates(store):
+    store.save_run(FECHA, [row("A", 90, habilidades="Python, Kubernetes"), row("B", 80, habilidades="Go")])
+    conn = store._connect()
+    assert conn.execute("SELECT COUNT(*) FROM terms").fetchone()[0] > 0
+
+    store.save_run(FECHA, [row("C", 70, habilidades="Rust")])  # Reemplaza el ranking de la ejecución
+    assert store.search("python")["total"] == 0
+    assert store.search("rust")["total"] == 1
+    orphans = "SELECT COUNT(*) FROM terms WHERE candidate_id NOT IN (SELECT id FROM candidates)"
+    assert conn.execute(orphans).fetchone()[0] == 0
+
+    with conn:
+        conn.execute("DELETE FROM runs WHERE fecha = ?", (FECHA,))
+    assert conn.execute("SELECT COUNT(*) FROM candidates").fetchone()[0] == 0
+    assert conn.execute("SELECT COUNT(*) FROM terms").fetchone()[0] == 0
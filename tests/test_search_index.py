@@ -0,0 +1,51 @@
+#Python 3.10
+# -*- coding: utf-8 -*-
+import sqlite3
+
+from search_index import clause_sql, index_terms, normalize_term, parse_query
+
+
+def test_implicit_and_explicit_and():
+    assert parse_query("Python AND Kubernetes") == [[(None, "python", False)], [(None, "kubernetes", False)]]
+    assert parse_query("Python Kubernetes") == parse_query("Python AND Kubernetes")
+
+
+def test_or_joins_with_previous_clause():
+    assert parse_query('Python AND "machine learning" OR R industria:finanzas') == [
+        [(None, "python", False)],
+        [(None, "machine learning", False), (None, "r", False)],
+        [("industria", "finanzas", False)],
+    ]
+
+
+def test_leading_or_and_unbalanced_quotes():
+    assert parse_query("OR python") == [[(None, "python", False)]]
+    assert parse_query('"machine learning') == [[(None, "machine", False)], [(None, "learning", False)]]
+
+
+def test_field_aliases_prefixes_and_accents():
+    assert parse_query("skill:kube* Análisis") == [[("habilidad", "kube", True)], [(None, "analisis", False)]]
+    assert normalize_term("  Análisis   de Datos ") == "analisis de datos"
+
+
+def test_clause_sql_matches_terms():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE terms (term TEXT, field TEXT, candidate_id INTEGER)")
+    rows = {1: {"Habilidades": "Python, Machine Learning", "industria": "Finanzas"},
+            2: {"Habilidades": "Kubernetes, Go", "industria": "Tecnología"},
+            3: {"Habilidades": "R", "industria": "Finanzas"}}
+    for candidate_id, row in rows.items():
+        conn.executemany("INSERT INTO terms VALUES (?, ?, ?)", [(term, field, candidate_id) for field, term in index_terms(row)])
+
+    def matches(query):
+        ids = None
+        for clause in parse_query(query):
+            sql, params = clause_sql(clause)
+            found = {row[0] for row in conn.execute(sql, params)}
+            ids = found if ids is None else ids & found
+        return ids
+
+    assert matches('"machine learning" OR kubernetes') == {1, 2}
+    assert matches("industria:finanzas python") == {1}
+    assert matches("habilidad:kube*") == {2}
+    assert matches("industria:python") == set()
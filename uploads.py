@@ -0,0 +1,109 @@
+#Python 3.10
+# -*- coding: utf-8 -*-
+import os
+import hashlib
+import tempfile
+
+from settings import get_settings
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+OBJECTS_FOLDER = "objects"  # Subcarpeta de uploads con los PDFs guardados por contenido
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+def object_path(upload_folder, digest):
+    """Ruta del PDF guardado por contenido: uploads/objects/ab/abcdef....pdf"""
+    return os.path.join(upload_folder, OBJECTS_FOLDER, digest[:2], f"{digest}.pdf")
+
+
+def ingest_upload(stream, upload_folder, max_bytes=None):
+    """Copia un archivo subido al almacén por contenido del usuario.
+
+    Lee ``stream`` por bloques, calculando el SHA-256 mientras escribe un archivo
+    temporal; si el contenido ya estaba guardado el temporal se descarta. Lanza
+    ``UploadTooLarge`` en cuanto se superan ``max_bytes`` (por defecto
+    ``max_upload_file_bytes`` de la configuración). Devuelve (ruta, sha256, bytes).
+    """
+    if max_bytes is None:
+        max_bytes = get_settings().max_upload_file_bytes
+    objects_folder = os.path.join(upload_folder, OBJECTS_FOLDER)
+    os.makedirs(objects_folder, exist_ok=True)
+
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=objects_folder, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as tmp_file:
+            for chunk in iter(lambda: stream.read(UPLOAD_CHUNK_SIZE), b""):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge(f"supera el límite de {max_bytes // (1024 * 1024)} MB")
+                digest.update(chunk)
+                tmp_file.write(chunk)
+
+        path = object_path(upload_folder, digest.hexdigest())
+        if os.path.exists(path):
+            os.remove(tmp_path)  # Mismo contenido ya subido antes: no se vuelve a guardar
+            os.utime(path)  # La limpieza de uploads borra los que no se usan hace tiempo
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    return path, digest.hexdigest(), size
+
+
+def stream_sha256(stream, max_bytes=None):
+    """Calcula el SHA-256 de un stream leyéndolo por bloques, sin guardarlo. Devuelve (sha256, bytes).
+
+    Lanza ``UploadTooLarge`` en cuanto se superan ``max_bytes`` (por defecto
+    ``max_upload_file_bytes`` de la configuración).
+    """
+    if max_bytes is None:
+        max_bytes = get_settings().max_upload_file_bytes
+    digest = hashlib.sha256()
+    size = 0
+    for chunk in iter(lambda: stream.read(UPLOAD_CHUNK_SIZE), b""):
+        size += len(chunk)
+        if size > max_bytes:
+            raise UploadTooLarge(f"supera el límite de {max_bytes // (1024 * 1024)} MB")
+        digest.update(chunk)
+    return digest.hexdigest(), size
+
+
+def ingest_uploads(files, upload_folder, max_file_bytes=None, max_request_bytes=None):
+    """Guarda varios archivos subidos (``FileStorage``) respetando los límites por archivo y por request.
+
+    Los límites que no se pasan se toman de la configuración. Devuelve una tupla
+    (lista de (nombre, ruta, sha256), error).
+    """
+    settings = get_settings()
+    if max_file_bytes is None:
+        max_file_bytes = settings.max_upload_file_bytes
+    if max_request_bytes is None:
+        max_request_bytes = settings.max_upload_request_bytes
+    request_error = f"Los archivos subidos superan el límite de {max_request_bytes // (1024 * 1024)} MB por análisis."
+    ingested = []
+    total = 0
+    for file in files:
+        remaining = max_request_bytes - total
+        if remaining <= 0:
+            return None, request_error
+        try:
+            path, digest, size = ingest_upload(file.stream, upload_folder, min(max_file_bytes, remaining))
+        except UploadTooLarge as e:
+            if total + max_file_bytes > max_request_bytes:
+                return None, request_error
+            return None, f"{file.filename}: {e}"
+        except OSError as e:
+            return None, f"{file.filename}: no se pudo guardar el archivo ({e})"
+
+        total += size
+        ingested.append((file.filename, path, digest))
+    return ingested, None
@@ -0,0 +1,118 @@
+#Python 3.10
+# -*- coding: utf-8 -*-
+import os
+import json
+import copy
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: solo se sincronizan los hilos del proceso
+    fcntl = None
+
+DEFAULT_USERS = {"admin": {"username": "admin", "nombre": "admin", "apellido": "admin", "password": "admin"}}
+
+_user_stores = {}
+_user_stores_lock = threading.Lock()
+
+
+class UserStore:
+    """Registro de usuarios compartido por todo el proceso.
+
+    El archivo JSON se lee una sola vez y se vuelve a cargar solo cuando cambia en disco
+    (mtime y tamaño), así que las páginas no lo parsean en cada request. Las
+    modificaciones se hacen dentro de ``batch()``: se toma un lock de archivo, se parte
+    del contenido actual del disco (para no pisar cambios de otros procesos) y se
+    escribe una única vez al salir, mediante un archivo temporal y ``os.replace``.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.version = 0  # Aumenta cada vez que cambia el contenido cargado
+        self._users = {}
+        self._signature = None
+        self._lock = threading.RLock()
+
+    def _stat_signature(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _refresh(self):
+        """Recarga el archivo si cambió desde la última lectura; lo crea con el admin por defecto si no existe."""
+        signature = self._stat_signature()
+        if signature is None:
+            with self.batch():
+                pass  # batch() crea el archivo con los usuarios por defecto
+            return
+        if signature == self._signature:
+            return
+
+        with open(self.path, "r") as file:
+            users = json.load(file)
+        self._users, self._signature = users, signature
+        self.version += 1
+
+    @contextmanager
+    def _file_lock(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path + ".lock", "a") as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _write(self, users):
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as file:
+            json.dump(users, file, indent=4)
+        os.replace(tmp_path, self.path)
+
+    def all(self):
+        """Devuelve una copia de todos los usuarios ({username: datos})."""
+        with self._lock:
+            self._refresh()
+            return copy.deepcopy(self._users)
+
+    def get(self, username):
+        """Devuelve una copia de los datos de un usuario o un diccionario vacío."""
+        with self._lock:
+            self._refresh()
+            return dict(self._users.get(username, {}))
+
+    @contextmanager
+    def batch(self):
+        """Permite aplicar varios cambios con una sola escritura del archivo.
+
+        Uso: ``with store.batch() as users: users["ana"] = {...}``. Si el bloque lanza
+        una excepción no se escribe nada.
+        """
+        with self._lock, self._file_lock():
+            if os.path.exists(self.path):
+                with open(self.path, "r") as file:
+                    users = json.load(file)
+            else:
+                users = copy.deepcopy(DEFAULT_USERS)
+            original = copy.deepcopy(users)
+
+            yield users
+
+            if users != original or self._stat_signature() is None:
+                self._write(users)
+            self._users, self._signature = users, self._stat_signature()
+            self.version += 1
+
+
+def get_user_store(path):
+    """Devuelve el registro de usuarios del archivo indicado (uno por proceso)."""
+    with _user_stores_lock:
+        store = _user_stores.get(path)
+        if store is None:
+            store = _user_stores[path] = UserStore(path)
+    return store